@@ -0,0 +1,14 @@
+"""
+Gunicorn configuration for movie_management.
+
+Run with: gunicorn movie_management.wsgi
+"""
+
+wsgi_app = 'movie_management.wsgi:application'
+
+
+def post_worker_init(worker):
+    # Runs in each worker after the app is loaded and before it accepts connections
+    from movies.warmup import warm_up
+
+    warm_up()
@@ -6,7 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movie_management.settings')
+    # `manage.py test` runs against in-memory SQLite unless a settings module is given
+    default_settings = 'movie_management.test_settings' if sys.argv[1:2] == ['test'] else 'movie_management.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', default_settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
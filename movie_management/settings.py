@@ -49,13 +49,14 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'knox',
     'movies',
 
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'movies.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -95,6 +96,24 @@ WSGI_APPLICATION = 'movie_management.wsgi.application'
 #     }
 # }
 
+# Startup budget checked by `manage.py profile_imports --budget-ms`
+STARTUP_IMPORT_BUDGET_MS = 1500
+
+# Seconds a stored Idempotency-Key response is replayed for (movies.utility.idempotent)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Pending reports per movie before the moderation queue collapses them into one entry
+REPORT_COLLAPSE_THRESHOLD = 10
+
+# Seconds an id gap in the outbox or the trending rating feed is waited on before it is
+# taken as a rolled-back insert, and how far delta sync cursors stay behind now; must
+# exceed the longest write transaction (movies.utility.committed_prefix, sync_movies)
+ID_GAP_TIMEOUT = 60
+
+# What an overrun of a view's @query_budget does: 'warn' (log), 'raise' or 'off'
+QUERY_BUDGET_MODE = 'warn'
+QUERY_BUDGET_CHECK_TIME = True
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [],  # No authentication required globally
     'DEFAULT_PERMISSION_CLASSES': [
@@ -143,6 +162,23 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic writes hash-named files plus .gz (and .br with Brotli installed) for WhiteNoise
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+WHITENOISE_MAX_AGE = 31536000
+
+# API response compression (movies.middleware.CompressionMiddleware); br and zstd
+# are used when the Brotli / zstandard packages are installed
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
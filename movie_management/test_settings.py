@@ -0,0 +1,59 @@
+"""
+Settings for test and benchmark runs.
+
+In-memory SQLite, fast password hashing and no static manifest, so
+`python manage.py test --parallel` runs without MySQL or collectstatic.
+"""
+
+import os
+import warnings
+
+# settings.py requires the MySQL credentials (no defaults, so production fails fast
+# without a .env); DATABASES is replaced below, so placeholders are enough here
+for name in ('DB_NAME', 'DB_USER', 'DB_PASSWORD', 'DB_PORT'):
+    os.environ.setdefault(name, '')
+
+from .settings import *  # noqa: E402,F401,F403
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        'ATOMIC_REQUESTS': True,
+    }
+}
+
+# Query-count budgets fail the test; DB time on a shared CI box is too noisy to assert
+QUERY_BUDGET_MODE = 'raise'
+QUERY_BUDGET_CHECK_TIME = False
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+AUTH_PASSWORD_VALIDATORS = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.InMemoryStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# STATIC_ROOT is only populated by collectstatic
+warnings.filterwarnings('ignore', message='No directory at', module='django.core.handlers.base')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'null': {'class': 'logging.NullHandler'}},
+    'root': {'handlers': ['null']},
+}
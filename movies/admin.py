@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import MovieReport
+from .models import Movie, MovieReport, MovieReportSummary, OutboxEvent, Rating
+from .paginators import LargeTablePaginator
 
 
 class MovieReportAdmin(admin.ModelAdmin):
@@ -18,5 +19,70 @@ class MovieReportAdmin(admin.ModelAdmin):
     # Optional: Make fields editable in the list view
     list_editable = ('status',)
 
+    # Join only the two displayed relations (a bare select_related() also pulls movie.created_by)
+    # and skip the exact COUNT(*) over the whole report table
+    list_select_related = ('movie', 'user')
+    ordering = ('-pk',)
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+    # Admin edits go through the same counter bookkeeping as the API so the
+    # moderation queue's MovieReportSummary stays in step
+    def save_model(self, request, obj, form, change):
+        if not change:
+            super().save_model(request, obj, form, change)
+            MovieReportSummary.adjust(obj.movie_id, pending=int(obj.status == 'PENDING'), total=1)
+        elif 'status' in form.changed_data:
+            new_status = obj.status
+            obj.status = form.initial['status']
+            super().save_model(request, obj, form, change)
+            obj.set_status(new_status)
+            OutboxEvent.record('report.status_changed', obj.movie_id, {'report_id': obj.id, 'status': new_status})
+        else:
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        MovieReportSummary.adjust(obj.movie_id, pending=-int(obj.status == 'PENDING'), total=-1)
+
+    def delete_queryset(self, request, queryset):
+        for report in queryset:
+            self.delete_model(request, report)
+
 
 admin.site.register(MovieReport, MovieReportAdmin)
+
+
+class MovieAdmin(admin.ModelAdmin):
+    # Built for millions of rows: no exact COUNT(*), no full-table FK dropdowns
+    list_display = ('title', 'genre', 'language', 'created_by', 'average_rating', 'total_rating', 'created_at')
+    list_select_related = ('created_by',)
+    autocomplete_fields = ('created_by',)
+    search_fields = ('=id', '^title')
+    date_hierarchy = 'created_at'
+    ordering = ('-pk',)
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+
+class RatingAdmin(admin.ModelAdmin):
+    list_display = ('movie', 'user', 'score', 'rated_at')
+    list_select_related = ('movie', 'user')
+    autocomplete_fields = ('movie', 'user')
+    date_hierarchy = 'rated_at'
+    ordering = ('-pk',)
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+    # The rating counters are kept by Rating.save()/delete(): a vote can change its
+    # score but not move to another movie or user, and deletes go row by row
+    def get_readonly_fields(self, request, obj=None):
+        return ('movie', 'user') if obj else ()
+
+    def delete_queryset(self, request, queryset):
+        for rating in queryset.select_related('movie'):
+            rating.delete()
+
+
+admin.site.register(Movie, MovieAdmin)
+admin.site.register(Rating, RatingAdmin)
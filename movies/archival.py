@@ -0,0 +1,59 @@
+import gzip
+import json
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedMovieReport, MovieReport
+
+RESOLVED_STATUSES = ['APPROVED', 'REJECTED']
+ARCHIVE_FIELDS = ['id', 'movie_id', 'user_id', 'reason', 'status', 'reported_at']
+
+
+def archive_resolved_reports(retention_days=30, batch_size=1000, path=None):
+    """
+    Move resolved reports older than the retention window out of MovieReport.
+
+    Each batch is selected with row locks, copied and deleted in one transaction.
+    Reports go to ArchivedMovieReport, or, when `path` is given, are appended to a
+    gzip NDJSON file instead. A crash between writing the file and committing the delete can
+    repeat a batch in the file; readers should de-duplicate on `id`.
+
+    Args:
+        retention_days (int): Resolved reports younger than this stay live.
+        batch_size (int): Rows per transaction.
+        path (str): Optional gzip NDJSON file to archive to instead of the table.
+
+    Returns:
+        int: Number of reports archived.
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    resolved = MovieReport.objects.filter(status__in=RESOLVED_STATUSES, reported_at__lt=cutoff).order_by('id')
+    archived = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            # Locked, so a report a moderator reopens meanwhile is either still
+            # resolved here or waits until this batch is archived
+            rows = list(
+                resolved.filter(id__gt=last_id).select_for_update().values(*ARCHIVE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return archived
+            last_id = rows[-1]['id']
+            ids = [row['id'] for row in rows]
+
+            if path:
+                with gzip.open(path, 'at', encoding='utf-8') as fh:
+                    for row in rows:
+                        fh.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+            else:
+                now = timezone.now()
+                ArchivedMovieReport.objects.bulk_create(
+                    [ArchivedMovieReport(archived_at=now, **row) for row in rows],
+                    ignore_conflicts=True,
+                )
+            MovieReport.objects.filter(id__in=ids).delete()
+        archived += len(rows)
@@ -0,0 +1,138 @@
+"""
+Data builders for tests and benchmarks.
+
+`make_*` create single rows through the ORM (signals and save() logic run);
+`bulk_*` insert many rows with bulk_create and fill in the derived counters
+themselves, for building large datasets quickly.
+"""
+
+import itertools
+import random
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, FloatField, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, TruncHour
+from django.utils import timezone
+
+from .models import Movie, MovieReport, MovieReportSummary, Rating, RatingActivityBucket, RatingCounterShard, \
+    RatingIngestWatermark
+
+_sequence = itertools.count(1)
+
+GENRES = ['Drama', 'Comedy', 'Action', 'Horror']
+LANGUAGES = ['English', 'Hindi', 'French']
+
+
+def make_user(**overrides):
+    n = next(_sequence)
+    fields = {'username': f'user-{n}', 'email': f'user-{n}@example.com', 'password': 'password'}
+    fields.update(overrides)
+    return User.objects.create_user(**fields)
+
+
+def make_movie(created_by=None, **overrides):
+    n = next(_sequence)
+    fields = {
+        'title': f'Movie {n}',
+        'description': f'Description {n}',
+        'released_at': timezone.now(),
+        'duration': 90,
+        'genre': GENRES[n % len(GENRES)],
+        'language': LANGUAGES[n % len(LANGUAGES)],
+        'created_by': created_by or make_user(),
+    }
+    fields.update(overrides)
+    return Movie.objects.create(**fields)
+
+
+def bulk_users(count, batch_size=1000):
+    start = next(_sequence)
+    # Unusable passwords: hashing is the slowest part of creating users
+    users = [User(username=f'bulk-{start}-{i}', password='!') for i in range(count)]
+    User.objects.bulk_create(users, batch_size=batch_size)
+    return list(User.objects.filter(username__startswith=f'bulk-{start}-').order_by('id'))
+
+
+def bulk_movies(count, created_by, batch_size=1000):
+    start = next(_sequence)
+    now = timezone.now()
+    movies = [
+        Movie(
+            title=f'Movie {start}-{i}', description=f'Description {i}', released_at=now, duration=90 + i % 60,
+            genre=GENRES[i % len(GENRES)], language=LANGUAGES[i % len(LANGUAGES)], created_by=created_by,
+        )
+        for i in range(count)
+    ]
+    Movie.objects.bulk_create(movies, batch_size=batch_size)
+    return list(Movie.objects.filter(title__startswith=f'Movie {start}-').order_by('id'))
+
+
+def bulk_ratings(movies, users, per_movie=1, batch_size=1000, seed=0):
+    """
+    Insert ratings and the counter shards / Movie aggregates they imply.
+
+    The trending activity buckets are filled in too and the ingest watermark moved
+    past the new ratings, as if `ingest_ratings` had already run.
+    """
+    rng = random.Random(seed)
+    ratings = [
+        Rating(movie=movie, user=users[(movie.id + i) % len(users)], score=rng.randint(1, 5))
+        for movie in movies for i in range(per_movie)
+    ]
+    Rating.objects.bulk_create(ratings, batch_size=batch_size)
+
+    movie_ids = [movie.id for movie in movies]
+    totals = Rating.objects.filter(movie_id__in=movie_ids).values('movie_id') \
+        .annotate(score_sum=Sum('score'), rating_count=Count('id'))
+    shards = [
+        RatingCounterShard(movie_id=row['movie_id'], shard=0, score_sum=row['score_sum'],
+                           rating_count=row['rating_count'])
+        for row in totals
+    ]
+    RatingCounterShard.objects.filter(movie_id__in=movie_ids).delete()
+    RatingCounterShard.objects.bulk_create(shards, batch_size=batch_size)
+    # One UPDATE from the shards; bulk_update's CASE per row is slow at 10k movies
+    shard = RatingCounterShard.objects.filter(movie_id=OuterRef('pk'))
+    Movie.objects.filter(id__in=movie_ids).update(
+        average_rating=Subquery(shard.values(average=Cast('score_sum', FloatField()) / F('rating_count'))),
+        total_rating=Subquery(shard.values('rating_count')),
+    )
+
+    hourly = Rating.objects.filter(movie_id__in=movie_ids) \
+        .values('movie_id', hour=TruncHour('rated_at')) \
+        .annotate(score_sum=Sum('score'), rating_count=Count('id'))
+    RatingActivityBucket.objects.filter(movie_id__in=movie_ids).delete()
+    RatingActivityBucket.objects.bulk_create(
+        [
+            RatingActivityBucket(movie_id=row['movie_id'], bucket_start=row['hour'], score_sum=row['score_sum'],
+                                 rating_count=row['rating_count'])
+            for row in hourly
+        ],
+        batch_size=batch_size,
+    )
+    RatingIngestWatermark.objects.update_or_create(
+        pk=1, defaults={'last_rating_id': Rating.objects.aggregate(last=Max('id'))['last'] or 0},
+    )
+    return ratings
+
+
+def bulk_reports(movies, users, per_movie=1, status='PENDING', batch_size=1000):
+    """
+    Insert reports (one per movie/user pair) and their per-movie summaries.
+    """
+    per_movie = min(per_movie, len(users))
+    reports = [
+        MovieReport(movie=movie, user=users[(movie.id + i) % len(users)], reason='spam', status=status)
+        for movie in movies for i in range(per_movie)
+    ]
+    MovieReport.objects.bulk_create(reports, batch_size=batch_size)
+    pending = per_movie if status == 'PENDING' else 0
+    MovieReportSummary.objects.bulk_create(
+        [
+            MovieReportSummary(movie=movie, pending_count=pending, total_count=per_movie,
+                               last_reported_at=timezone.now())
+            for movie in movies
+        ],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+    return reports
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from movies.archival import archive_resolved_reports
+
+
+class Command(BaseCommand):
+    help = "Move resolved movie reports older than the retention window to the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--file', dest='path', help="Append to this gzip NDJSON file instead of the archive table.")
+
+    def handle(self, *args, **options):
+        archived = archive_resolved_reports(options['retention_days'], options['batch_size'], options['path'])
+        self.stdout.write(f"Archived {archived} reports")
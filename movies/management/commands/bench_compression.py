@@ -0,0 +1,59 @@
+import json
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from movies.compression import available_encoders, compress_bytes
+
+LEVELS = {
+    'gzip': [1, 6, 9],
+    'br': [1, 4, 6, 11],
+    'zstd': [1, 3, 9, 19],
+}
+
+
+def build_payload(rows):
+    """
+    Build a movie list JSON body shaped like `list_all_movies` output.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    movies = [
+        {
+            'title': f'Movie {i}',
+            'description': f'A story about movie number {i}, its cast and its crew.',
+            'duration': 80 + i % 90,
+            'genre': ['Drama', 'Comedy', 'Action', 'Horror'][i % 4],
+            'average_rating': round((i % 50) / 10, 1),
+            'total_rating': i % 1000,
+            'language': ['English', 'Hindi', 'French'][i % 3],
+            'updated_at': now,
+        }
+        for i in range(rows)
+    ]
+    return json.dumps(movies).encode()
+
+
+class Command(BaseCommand):
+    help = "Measure bytes on the wire and CPU time per encoding and level for a movie list payload."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        payload = build_payload(options['rows'])
+        self.stdout.write(f"Payload: {options['rows']} movies, {len(payload)} bytes")
+        self.stdout.write(f"{'encoding':<8} {'level':>5} {'bytes':>10} {'ratio':>7} {'ms':>8} {'MB/s':>8}")
+
+        for name, encoder_class in available_encoders().items():
+            for level in LEVELS[name]:
+                start = time.process_time()
+                for _ in range(options['repeat']):
+                    compressed = compress_bytes(encoder_class(level), payload)
+                elapsed = (time.process_time() - start) / options['repeat']
+                throughput = len(payload) / elapsed / 1e6 if elapsed else float('inf')
+                self.stdout.write(
+                    f"{name:<8} {level:>5} {len(compressed):>10} {len(payload) / len(compressed):>7.1f} "
+                    f"{elapsed * 1000:>8.2f} {throughput:>8.1f}"
+                )
@@ -0,0 +1,73 @@
+import random
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from movies.models import Movie, MovieTombstone, OutboxEvent, Rating
+
+
+class Command(BaseCommand):
+    help = (
+        "Cast concurrent votes on one movie from several threads and report votes/second "
+        "for each shard count. Runs against the configured database and removes its movies, ratings, "
+        "outbox events and tombstones afterwards; a relay running meanwhile can still pick up its "
+        "rating.saved events, so don't point it at production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--votes', type=int, default=200, help="Votes per thread.")
+        parser.add_argument('--shards', default='1,4,16', help="Comma-separated shard counts to compare.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stderr.write("SQLite serialises all writers; run against MySQL/PostgreSQL to see the gain.")
+
+        owner = User.objects.create_user(username=f'bench-{time.time_ns()}')
+        voters = [User.objects.create_user(username=f'{owner.username}-{i}') for i in range(options['threads'])]
+        movie_ids = []
+        try:
+            self.stdout.write(f"{'shards':>6} {'votes':>7} {'errors':>7} {'seconds':>8} {'votes/s':>9}")
+            for shards in [int(value) for value in options['shards'].split(',')]:
+                self.run(owner, voters, shards, options['votes'], movie_ids)
+        finally:
+            # Deleting the movies leaves tombstones, and every vote left an outbox event
+            Movie.objects.filter(pk__in=movie_ids).delete()
+            MovieTombstone.objects.filter(movie_id__in=movie_ids).delete()
+            OutboxEvent.objects.filter(aggregate_id__in=movie_ids).delete()
+            User.objects.filter(pk__in=[owner.pk] + [voter.pk for voter in voters]).delete()
+
+    def run(self, owner, voters, shards, votes_per_thread, movie_ids):
+        movie = Movie.objects.create(
+            title='Contention benchmark', description='', released_at=timezone.now(), duration=1,
+            genre='Benchmark', language='None', created_by=owner, rating_shards=shards,
+        )
+        movie_ids.append(movie.id)
+        errors = []
+        barrier = threading.Barrier(len(voters))
+
+        def vote(user):
+            barrier.wait()
+            try:
+                for _ in range(votes_per_thread):
+                    try:
+                        Rating(movie=movie, user=user, score=random.randint(1, 5)).save()
+                    except OperationalError:
+                        errors.append(1)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=vote, args=(user,)) for user in voters]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        total = votes_per_thread * len(voters) - len(errors)
+        self.stdout.write(f"{shards:>6} {total:>7} {len(errors):>7} {elapsed:>8.2f} {total / elapsed:>9.1f}")
@@ -0,0 +1,22 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.tasks import enqueue
+
+
+class Command(BaseCommand):
+    help = "Queue a background task, e.g. rebuild_rating_aggregates or purge_resolved_reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name')
+        parser.add_argument('--payload', default='{}', help="JSON object of keyword arguments.")
+        parser.add_argument('--delay', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            payload = json.loads(options['payload'])
+            queued = enqueue(options['name'], payload, delay=options['delay'])
+        except (ValueError, TypeError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(f"Queued {queued}")
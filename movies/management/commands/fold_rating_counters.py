@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+
+from movies.models import CatalogueVersion, Movie, RatingCounterShard
+
+
+class Command(BaseCommand):
+    help = "Fold rating counter shards into Movie.average_rating / total_rating."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since-seconds', type=int, default=None,
+            help="Only fold movies whose shards changed in this window (run periodically with ~2x the interval).",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        shards = RatingCounterShard.objects.all()
+        if options['since_seconds'] is not None:
+            shards = shards.filter(updated_at__gte=timezone.now() - timedelta(seconds=options['since_seconds']))
+        movie_ids = list(shards.values_list('movie_id', flat=True).distinct())
+
+        folded = 0
+        for start in range(0, len(movie_ids), options['batch_size']):
+            batch = movie_ids[start:start + options['batch_size']]
+            totals = (
+                RatingCounterShard.objects.filter(movie_id__in=batch)
+                .values('movie_id')
+                .annotate(score_sum=Sum('score_sum'), rating_count=Sum('rating_count'))
+            )
+            now = timezone.now()
+            for row in totals:
+                count = row['rating_count'] or 0
+                Movie.objects.filter(pk=row['movie_id']).update(
+                    average_rating=row['score_sum'] / count if count else 0.0,
+                    total_rating=count,
+                    updated_at=now,
+                )
+                folded += 1
+
+        if folded:
+            CatalogueVersion.bump()
+        self.stdout.write(f"Folded rating counters for {folded} movies")
@@ -0,0 +1,67 @@
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)')
+
+
+def parse_importtime(output):
+    """
+    Parse the stderr of ``python -X importtime``.
+
+    Args:
+        output (str): Raw stderr text.
+
+    Returns:
+        list: (module, self_us, cumulative_us, depth) tuples.
+    """
+    rows = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Report the slowest imports when loading the WSGI application."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='movie_management.wsgi')
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--sort', choices=['self', 'cumulative'], default='cumulative')
+        parser.add_argument(
+            '--budget-ms', type=float, default=None,
+            help="Fail when the total import time exceeds this many milliseconds "
+                 "(defaults to settings.STARTUP_IMPORT_BUDGET_MS).",
+        )
+
+    def handle(self, *args, **options):
+        # Run in a fresh interpreter; this process has already imported everything
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f"import {options['module']}"],
+            capture_output=True, text=True,
+        )
+        rows = parse_importtime(proc.stderr)
+        if proc.returncode != 0:
+            raise CommandError(f"Importing {options['module']} failed:\n{proc.stderr[-2000:]}")
+
+        top_level = [row for row in rows if row[3] == 0]
+        total_ms = sum(row[2] for row in top_level) / 1000
+        key = 1 if options['sort'] == 'self' else 2
+        slowest = sorted(rows, key=lambda row: row[key], reverse=True)[:options['top']]
+
+        self.stdout.write(f"{'self ms':>10} {'cumul ms':>10}  module")
+        for module, self_us, cumulative_us, _depth in slowest:
+            self.stdout.write(f"{self_us / 1000:>10.1f} {cumulative_us / 1000:>10.1f}  {module}")
+        self.stdout.write(f"Total import time for {options['module']}: {total_ms:.1f} ms")
+
+        budget = options['budget_ms']
+        if budget is None:
+            budget = getattr(settings, 'STARTUP_IMPORT_BUDGET_MS', None)
+        if budget is not None and total_ms > budget:
+            raise CommandError(f"Startup import budget exceeded: {total_ms:.1f} ms > {budget:.1f} ms")
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies.trending import ingest_ratings, refresh_rankings
+
+
+class Command(BaseCommand):
+    help = "Ingest new ratings into hourly buckets and rebuild the trending rankings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep refreshing every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        while True:
+            ingested = ingest_ratings()
+            counts = refresh_rankings()
+            summary = ', '.join(f'{window}: {count}' for window, count in counts.items())
+            self.stdout.write(f"Ingested {ingested} ratings; ranked {summary}")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
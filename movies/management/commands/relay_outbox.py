@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.outbox import build_sink, relay_batch
+
+
+class Command(BaseCommand):
+    help = "Publish outbox events to a sink in batches, tracking a per-consumer offset."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', choices=['file', 'webhook', 'inprocess'], default='file')
+        parser.add_argument('--target', help="File path or webhook URL.")
+        parser.add_argument('--consumer', help="Offset name; defaults to the sink name.")
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting when drained.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when idle in --loop mode.")
+
+    def handle(self, *args, **options):
+        if options['sink'] in ('file', 'webhook') and not options['target']:
+            raise CommandError("--target is required for the file and webhook sinks")
+
+        sink = build_sink(options['sink'], options['target'])
+        consumer = options['consumer'] or options['sink']
+        total = 0
+        while True:
+            published = relay_batch(sink, consumer, options['batch_size'])
+            total += published
+            if published:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(f"Published {total} events for consumer '{consumer}'")
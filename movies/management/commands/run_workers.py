@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from movies.tasks import DEFAULT_LEASE_SECONDS, claim, run_task
+
+
+def worker_loop(index, stop, poll_interval, lease_seconds):
+    # Forked child: the parent coordinates shutdown through `stop`. Signal handlers
+    # only flip a flag; touching the multiprocessing Event from one can deadlock.
+    terminated = []
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: terminated.append(signum))
+    worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+    try:
+        while not terminated and not stop.is_set():
+            claimed = claim(worker_id, lease_seconds)
+            if claimed is None:
+                stop.wait(poll_interval)
+                continue
+            run_task(claimed, lease_seconds)
+    finally:
+        connections.close_all()
+
+
+def stop_workers(procs, stop, timeout):
+    """
+    Ask workers to stop, then SIGKILL those still running after `timeout` seconds.
+
+    Workers ignore SIGTERM apart from setting a flag, so terminate() can't interrupt
+    a long task. A killed worker's task keeps its RUNNING state until the lease
+    expires and another worker re-claims it.
+
+    Returns:
+        int: Number of workers killed.
+    """
+    stop.set()
+    # Graceful: each worker finishes its current task, then exits
+    deadline = time.monotonic() + timeout
+    for proc in procs:
+        proc.join(max(deadline - time.monotonic(), 0))
+    killed = 0
+    for proc in procs:
+        if proc.is_alive():
+            proc.kill()
+            proc.join()
+            killed += 1
+    return killed
+
+
+class Command(BaseCommand):
+    help = "Run background task workers in a pool of processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procs', type=int, default=2)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--lease-seconds', type=int, default=DEFAULT_LEASE_SECONDS)
+        parser.add_argument('--shutdown-timeout', type=float, default=30.0,
+                            help="Seconds to let running tasks finish before workers are killed.")
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        # Children must not share the parent's database sockets
+        connections.close_all()
+        procs = [
+            context.Process(
+                target=worker_loop, args=(i, stop, options['poll_interval'], options['lease_seconds']),
+                name=f'task-worker-{i}',
+            )
+            for i in range(options['procs'])
+        ]
+        for proc in procs:
+            proc.start()
+        self.stdout.write(f"Started {len(procs)} workers")
+
+        stopping = []
+        signal.signal(signal.SIGINT, lambda signum, frame: stopping.append(signum))
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+        while not stopping and any(proc.is_alive() for proc in procs):
+            time.sleep(0.5)
+        killed = stop_workers(procs, stop, options['shutdown_timeout'])
+        if killed:
+            self.stderr.write(f"Killed {killed} workers still running after {options['shutdown_timeout']}s")
+        self.stdout.write("Workers stopped")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.models import Movie
+
+
+class Command(BaseCommand):
+    help = "Set how many rating counter shards a movie spreads its votes over."
+
+    def add_arguments(self, parser):
+        parser.add_argument('movie_id', type=int)
+        parser.add_argument('shards', type=int)
+
+    def handle(self, *args, **options):
+        if not 1 <= options['shards'] <= 256:
+            raise CommandError("shards must be between 1 and 256")
+        # Existing shard rows stay and are still summed, so narrowing loses nothing
+        updated = Movie.objects.filter(pk=options['movie_id']).update(rating_shards=options['shards'])
+        if not updated:
+            raise CommandError(f"Movie {options['movie_id']} not found")
+        self.stdout.write(f"Movie {options['movie_id']} now uses {options['shards']} rating shards")
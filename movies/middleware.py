@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .compression import available_encoders, compress_bytes, compress_stream, compress_stream_async, \
+    negotiate_encoding
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/x-ndjson')
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with the best encoding the client accepts (br, zstd or gzip).
+
+    Settings:
+        COMPRESSION_MIN_SIZE: bytes below which non-streaming responses are sent as is.
+        COMPRESSION_LEVELS: per-encoding compression level.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.encoders = available_encoders()
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+        self.levels = {**DEFAULT_LEVELS, **getattr(settings, 'COMPRESSION_LEVELS', {})}
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encoders)
+        if encoding is None:
+            return response
+
+        encoder = self.encoders[encoding](self.levels[encoding])
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_stream_async(encoder, response.streaming_content)
+            else:
+                response.streaming_content = compress_stream(encoder, response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = compress_bytes(encoder, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The body differs per encoding, so a strong ETag must become weak (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
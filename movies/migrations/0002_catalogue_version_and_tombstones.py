@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-19 14:58
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_catalogue_version(apps, schema_editor):
+    CatalogueVersion = apps.get_model('movies', 'CatalogueVersion')
+    CatalogueVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MovieTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movie_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['updated_at', 'id'], name='movie_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movietombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'),
+        ),
+        migrations.RunPython(create_catalogue_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-19 15:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_outbox_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moviereport',
+            index=models.Index(fields=['user', 'reported_at', 'status'], name='report_user_reported_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['user', 'movie', 'score'], name='rating_user_movie_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.3 on 2026-10-19 15:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+
+
+def dedupe_reports_and_build_summaries(apps, schema_editor):
+    MovieReport = apps.get_model('movies', 'MovieReport')
+    MovieReportSummary = apps.get_model('movies', 'MovieReportSummary')
+
+    # Keep the earliest report per (movie, user) so the unique constraint can be added
+    duplicates = (
+        MovieReport.objects.values('movie_id', 'user_id')
+        .annotate(keep_id=Min('id'), n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for row in duplicates.iterator():
+        MovieReport.objects.filter(movie_id=row['movie_id'], user_id=row['user_id']) \
+            .exclude(id=row['keep_id']).delete()
+
+    summaries = (
+        MovieReport.objects.values('movie_id')
+        .annotate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='PENDING')),
+            last=Max('reported_at'),
+        )
+    )
+    MovieReportSummary.objects.bulk_create(
+        [
+            MovieReportSummary(
+                movie_id=row['movie_id'], pending_count=row['pending'],
+                total_count=row['total'], last_reported_at=row['last'],
+            )
+            for row in summaries.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_user_activity_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieReportSummary',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='report_summary', serialize=False, to='movies.movie')),
+                ('pending_count', models.IntegerField(default=0)),
+                ('total_count', models.IntegerField(default=0)),
+                ('last_reported_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(dedupe_reports_and_build_summaries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='moviereport',
+            constraint=models.UniqueConstraint(fields=('movie', 'user'), name='unique_report_per_user'),
+        ),
+        migrations.AddIndex(
+            model_name='moviereportsummary',
+            index=models.Index(fields=['pending_count'], name='report_summary_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-19 15:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_shards(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    Rating = apps.get_model('movies', 'Rating')
+    RatingCounterShard = apps.get_model('movies', 'RatingCounterShard')
+
+    totals = Rating.objects.values('movie_id').annotate(score_sum=Sum('score'), rating_count=Count('id'))
+    shards = []
+    for row in totals.iterator():
+        shards.append(RatingCounterShard(
+            movie_id=row['movie_id'], shard=0, score_sum=row['score_sum'], rating_count=row['rating_count'],
+        ))
+        Movie.objects.filter(pk=row['movie_id']).update(
+            average_rating=row['score_sum'] / row['rating_count'], total_rating=row['rating_count'],
+        )
+    RatingCounterShard.objects.bulk_create(shards, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='rating_shards',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='RatingCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('score_sum', models.BigIntegerField(default=0)),
+                ('rating_count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_counter_shards', to='movies.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('movie', 'shard'), name='unique_rating_shard')],
+            },
+        ),
+        migrations.RunPython(backfill_rating_shards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-19 15:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_rating_counter_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingActivityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('rating_count', models.IntegerField(default=0)),
+                ('score_sum', models.IntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_buckets', to='movies.movie')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start'], name='activity_bucket_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('movie', 'bucket_start'), name='unique_activity_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingMovie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('1h', '1 hour'), ('24h', '24 hours'), ('7d', '7 days')], max_length=3)),
+                ('rank', models.IntegerField()),
+                ('score', models.FloatField()),
+                ('genre', models.CharField(max_length=100)),
+                ('language', models.CharField(max_length=100)),
+                ('refreshed_at', models.DateTimeField()),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movies.movie')),
+            ],
+            options={
+                'ordering': ['window', 'rank'],
+                'indexes': [models.Index(fields=['window', 'rank'], name='trending_window_rank_idx'), models.Index(fields=['window', 'genre', 'rank'], name='trending_genre_rank_idx'), models.Index(fields=['window', 'language', 'rank'], name='trending_language_rank_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-19 15:14
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_tasks'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMovieReport',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('movie_id', models.BigIntegerField()),
+                ('user_id', models.BigIntegerField()),
+                ('reason', models.TextField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected')], max_length=10)),
+                ('reported_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='moviereport',
+            index=models.Index(fields=['status', 'reported_at'], name='report_status_reported_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmoviereport',
+            index=models.Index(fields=['movie_id', 'id'], name='archived_report_movie_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmoviereport',
+            index=models.Index(fields=['user_id', 'id'], name='archived_report_user_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-19 15:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_archived_reports'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='moviereport',
+            name='report_user_reported_idx',
+        ),
+        migrations.AddIndex(
+            model_name='moviereport',
+            index=models.Index(fields=['user', 'reported_at', 'status', 'movie'], name='report_user_reported_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-19 15:35
+
+from django.db import migrations, models
+
+
+def move_watermark(apps, schema_editor):
+    # The watermark used to live in the outbox's ConsumerOffset table, where a relay
+    # started with `--consumer trending-ratings` would have overwritten it
+    ConsumerOffset = apps.get_model('movies', 'ConsumerOffset')
+    RatingIngestWatermark = apps.get_model('movies', 'RatingIngestWatermark')
+    offset = ConsumerOffset.objects.filter(consumer='trending-ratings').first()
+    if offset is not None:
+        RatingIngestWatermark.objects.create(pk=1, last_rating_id=offset.last_event_id)
+        offset.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0012_report_user_index_covers_movie'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingIngestWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_rating_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(move_watermark, migrations.RunPython.noop),
+    ]
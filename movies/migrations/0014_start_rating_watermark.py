@@ -0,0 +1,25 @@
+from django.db import migrations
+from django.db.models import Max
+
+
+def start_after_backfilled_ratings(apps, schema_editor):
+    # 0006 stamped every existing rating's rated_at with the migration time; ingesting
+    # them would pile the whole history into one hourly bucket
+    Rating = apps.get_model('movies', 'Rating')
+    RatingIngestWatermark = apps.get_model('movies', 'RatingIngestWatermark')
+    last_id = Rating.objects.aggregate(last=Max('id'))['last'] or 0
+    watermark, created = RatingIngestWatermark.objects.get_or_create(pk=1, defaults={'last_rating_id': last_id})
+    if not created and not watermark.last_rating_id:
+        watermark.last_rating_id = last_id
+        watermark.save(update_fields=['last_rating_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0013_rating_ingest_watermark'),
+    ]
+
+    operations = [
+        migrations.RunPython(start_after_backfilled_ratings, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,11 @@
+import random
 
 from django.utils import timezone
 
 from django.contrib.auth.models import AbstractUser, User
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 
 # Example models for User, Movie, and Rating
 class Movie(models.Model):
@@ -16,6 +18,8 @@ class Movie(models.Model):
     average_rating = models.FloatField(default=0.0)
     total_rating = models.IntegerField(default=0)
     language = models.CharField(max_length=100)
+    # Rating counter rows for this movie; widen for hot titles (see RatingCounterShard)
+    rating_shards = models.PositiveSmallIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
 
     updated_at = models.DateTimeField(auto_now=True)
@@ -23,21 +27,112 @@ class Movie(models.Model):
     def __str__(self):
         return self.title
 
+    def live_rating(self):
+        """
+        Current (average_rating, total_rating) summed from the counter shards.
+        """
+        totals = self.rating_counter_shards.aggregate(
+            score_sum=models.Sum('score_sum'), rating_count=models.Sum('rating_count'),
+        )
+        count = totals['rating_count'] or 0
+        return (totals['score_sum'] / count if count else 0.0), count
+
+    def fold_rating_shards(self):
+        """
+        Write the shard totals into `average_rating` / `total_rating`.
+
+        Uses a queryset update so only the two counters and `updated_at` are written.
+        """
+        self.average_rating, self.total_rating = self.live_rating()
+        self.updated_at = timezone.now()
+        Movie.objects.filter(pk=self.pk).update(
+            average_rating=self.average_rating, total_rating=self.total_rating, updated_at=self.updated_at,
+        )
+        CatalogueVersion.bump()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Delta sync walks movies in (updated_at, id) order
+            models.Index(fields=['updated_at', 'id'], name='movie_updated_id_idx'),
+            # Default ordering and the admin date hierarchy
+            models.Index(fields=['created_at'], name='movie_created_idx'),
+        ]
 
 class Rating(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     score = models.IntegerField(choices=[(1, '1'), (2, '2'), (3, '3'), (4, '4'), (5, '5')])
+    rated_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Covers the per-user rating summary and drives the rating list, which
+            # still joins Movie for titles
+            models.Index(fields=['user', 'movie', 'score'], name='rating_user_movie_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update average rating after each save
-        movie = self.movie
-        ratings = movie.rating_set.all()
-        movie.average_rating = sum(r.score for r in ratings) / len(ratings)
-        movie.save()
+        with transaction.atomic():
+            previous_score = None
+            if self.pk:
+                previous_score = Rating.objects.filter(pk=self.pk).values_list('score', flat=True).first()
+            super().save(*args, **kwargs)
+
+            # Add this vote to one counter shard instead of locking the Movie row
+            movie = self.movie
+            if previous_score is None:
+                RatingCounterShard.add(movie, self.score, 1)
+            elif previous_score != self.score:
+                RatingCounterShard.add(movie, self.score - previous_score, 0)
+
+            # Single-shard movies fold straight away; widened (hot) movies are
+            # folded by `fold_rating_counters` or read live from the shards
+            if movie.rating_shards <= 1:
+                movie.fold_rating_shards()
+            OutboxEvent.record('rating.saved', self.movie_id, {'user_id': self.user_id, 'score': self.score})
+
+    def delete(self, *args, **kwargs):
+        # Mirrors save(): take the vote back out of the counters. Queryset deletes
+        # bypass this, so delete ratings one by one (see RatingAdmin).
+        with transaction.atomic():
+            movie = self.movie
+            score, movie_id, user_id = self.score, self.movie_id, self.user_id
+            deleted = super().delete(*args, **kwargs)
+            RatingCounterShard.add(movie, -score, -1)
+            if movie.rating_shards <= 1:
+                movie.fold_rating_shards()
+            OutboxEvent.record('rating.deleted', movie_id, {'user_id': user_id, 'score': score})
+        return deleted
+
+
+class RatingCounterShard(models.Model):
+    # One of `Movie.rating_shards` partial sums of a movie's ratings
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='rating_counter_shards')
+    shard = models.PositiveSmallIntegerField()
+    score_sum = models.BigIntegerField(default=0)
+    rating_count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'shard'], name='unique_rating_shard'),
+        ]
+
+    def __str__(self):
+        return f'{self.movie_id}[{self.shard}]: {self.score_sum}/{self.rating_count}'
+
+    @classmethod
+    def add(cls, movie, score_delta, count_delta):
+        shard = random.randrange(max(movie.rating_shards, 1))
+        fields = {
+            'score_sum': models.F('score_sum') + score_delta,
+            'rating_count': models.F('rating_count') + count_delta,
+            'updated_at': timezone.now(),
+        }
+        if not cls.objects.filter(movie=movie, shard=shard).update(**fields):
+            cls.objects.get_or_create(movie=movie, shard=shard)
+            cls.objects.filter(movie=movie, shard=shard).update(**fields)
 
 
 class MovieReport(models.Model):
@@ -53,5 +148,283 @@ class MovieReport(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     reported_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Covers the per-user report list (which returns movie_id) and summary
+            models.Index(fields=['user', 'reported_at', 'status', 'movie'], name='report_user_reported_idx'),
+            # Moderation queue (PENDING) and archival scans (resolved, older than a cutoff)
+            models.Index(fields=['status', 'reported_at'], name='report_status_reported_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'user'], name='unique_report_per_user'),
+        ]
+
     def __str__(self):
         return f'Report by {self.user} on {self.movie}'
+
+    @classmethod
+    def file(cls, movie, user, reason):
+        """
+        Create or refresh the single report a user may hold against a movie.
+
+        Returns:
+            tuple: (report, created)
+        """
+        with transaction.atomic():
+            report, created = cls.objects.get_or_create(movie=movie, user=user, defaults={'reason': reason})
+            if created:
+                MovieReportSummary.adjust(movie.id, pending=1, total=1)
+            elif report.reason != reason:
+                report.reason = reason
+                report.save(update_fields=['reason'])
+        return report, created
+
+    def set_status(self, new_status):
+        """
+        Change the moderation status and keep the movie's pending counter in step.
+        """
+        old_status = self.status
+        with transaction.atomic():
+            self.status = new_status
+            self.save(update_fields=['status'])
+            pending = (new_status == 'PENDING') - (old_status == 'PENDING')
+            if pending:
+                MovieReportSummary.adjust(self.movie_id, pending=pending)
+
+
+class ArchivedMovieReport(models.Model):
+    # Resolved reports moved out of MovieReport by `archive_reports`; ids are kept
+    id = models.BigIntegerField(primary_key=True)
+    movie_id = models.BigIntegerField()
+    user_id = models.BigIntegerField()
+    reason = models.TextField()
+    status = models.CharField(max_length=10, choices=MovieReport.STATUS_CHOICES)
+    reported_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['movie_id', 'id'], name='archived_report_movie_idx'),
+            models.Index(fields=['user_id', 'id'], name='archived_report_user_idx'),
+        ]
+
+    def __str__(self):
+        return f'Archived report {self.id} on movie {self.movie_id}'
+
+
+class MovieReportSummary(models.Model):
+    # Per-movie report counters so the moderation queue can collapse report waves
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='report_summary')
+    pending_count = models.IntegerField(default=0)
+    total_count = models.IntegerField(default=0)
+    last_reported_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pending_count'], name='report_summary_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.movie_id}: {self.pending_count} pending'
+
+    @classmethod
+    def adjust(cls, movie_id, pending=0, total=0):
+        fields = {
+            'pending_count': models.F('pending_count') + pending,
+            'total_count': models.F('total_count') + total,
+        }
+        if total:
+            fields['last_reported_at'] = timezone.now()
+        if not cls.objects.filter(movie_id=movie_id).update(**fields):
+            cls.objects.get_or_create(movie_id=movie_id)
+            cls.objects.filter(movie_id=movie_id).update(**fields)
+
+
+class MovieTombstone(models.Model):
+    # Left behind when a movie is deleted so delta sync clients can drop it
+    movie_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'),
+        ]
+
+    def __str__(self):
+        return f'Movie {self.movie_id} deleted at {self.deleted_at}'
+
+
+class CatalogueVersion(models.Model):
+    # Single row bumped on every movie write; used to build the movie list ETag
+    version = models.BigIntegerField(default=0)
+
+    @classmethod
+    def current(cls):
+        row = cls.objects.filter(pk=1).values_list('version', flat=True).first()
+        return row or 0
+
+    @classmethod
+    def bump(cls):
+        """
+        Advance the version once the current transaction commits.
+
+        The UPDATE runs after commit as its own short statement, so writers don't
+        hold this single row's lock for the rest of their request. A list read
+        between the commit and the bump gets the new rows under the old ETag,
+        and is refetched after the bump.
+        """
+        transaction.on_commit(cls._increment, robust=True)
+
+    @classmethod
+    def _increment(cls):
+        updated = cls.objects.filter(pk=1).update(version=models.F('version') + 1)
+        if not updated:
+            cls.objects.get_or_create(pk=1, defaults={'version': 1})
+
+
+class OutboxEvent(models.Model):
+    # Written in the same transaction as the change it describes; relayed by `relay_outbox`
+    event_type = models.CharField(max_length=50)
+    aggregate_id = models.BigIntegerField()
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.event_type} #{self.aggregate_id}'
+
+    @classmethod
+    def record(cls, event_type, aggregate_id, payload=None):
+        return cls.objects.create(event_type=event_type, aggregate_id=aggregate_id, payload=payload or {})
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'aggregate_id': self.aggregate_id,
+            'payload': self.payload,
+            'created_at': self.created_at.isoformat(),
+        }
+
+
+class ConsumerOffset(models.Model):
+    # Last outbox event id a relay consumer has delivered
+    consumer = models.CharField(max_length=100, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.consumer} @ {self.last_event_id}'
+
+
+class RatingIngestWatermark(models.Model):
+    # Single row: highest Rating id folded into RatingActivityBucket by `refresh_trending`
+    last_rating_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Ratings ingested up to {self.last_rating_id}'
+
+
+class RatingActivityBucket(models.Model):
+    # Ratings per movie per hour, filled by `refresh_trending` from new Rating rows
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='activity_buckets')
+    bucket_start = models.DateTimeField()
+    rating_count = models.IntegerField(default=0)
+    score_sum = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'bucket_start'], name='unique_activity_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start'], name='activity_bucket_start_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.movie_id} @ {self.bucket_start}: {self.rating_count}'
+
+
+class TrendingMovie(models.Model):
+    # Materialized ranking per window; genre/language copied so filtered reads stay on the index
+    WINDOW_CHOICES = [
+        ('1h', '1 hour'),
+        ('24h', '24 hours'),
+        ('7d', '7 days'),
+    ]
+
+    window = models.CharField(max_length=3, choices=WINDOW_CHOICES)
+    rank = models.IntegerField()
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    genre = models.CharField(max_length=100)
+    language = models.CharField(max_length=100)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['window', 'rank']
+        indexes = [
+            models.Index(fields=['window', 'rank'], name='trending_window_rank_idx'),
+            models.Index(fields=['window', 'genre', 'rank'], name='trending_genre_rank_idx'),
+            models.Index(fields=['window', 'language', 'rank'], name='trending_language_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.window} #{self.rank}: {self.movie_id}'
+
+
+class IdempotencyKey(models.Model):
+    # Stored response for an `Idempotency-Key` so client retries are replayed, not re-run
+    user_id = models.BigIntegerField()
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # null while in flight
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}:{self.key}'
+
+    @classmethod
+    def purge_expired(cls, batch_size=1000):
+        deleted = 0
+        while True:
+            ids = list(cls.objects.filter(expires_at__lt=timezone.now()).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += cls.objects.filter(id__in=ids).delete()[0]
+
+
+class Task(models.Model):
+    # Background work claimed by `manage.py run_workers` (see movies/tasks.py)
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_status_run_after_idx'),
+            models.Index(fields=['status', 'lease_expires_at'], name='task_status_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
@@ -0,0 +1,120 @@
+import json
+import logging
+import urllib.request
+
+from django.db import transaction
+
+from .models import ConsumerOffset, OutboxEvent
+from .utility import committed_prefix
+
+logger = logging.getLogger(__name__)
+
+_subscribers = []
+
+
+def subscribe(callback):
+    """
+    Register an in-process subscriber.
+
+    Args:
+        callback (callable): Called with a list of event dicts per delivered batch.
+
+    Returns:
+        callable: The callback, so this can be used as a decorator.
+    """
+    _subscribers.append(callback)
+    return callback
+
+
+def unsubscribe(callback):
+    if callback in _subscribers:
+        _subscribers.remove(callback)
+
+
+class FileSink:
+    """Appends events to a local file, one JSON object per line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def publish(self, events):
+        with open(self.path, 'a', encoding='utf-8') as fh:
+            for event in events:
+                fh.write(json.dumps(event) + '\n')
+
+
+class WebhookSink:
+    """POSTs each batch as a JSON array to a URL."""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def publish(self, events):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(events).encode(), method='POST',
+            headers={'Content-Type': 'application/json'},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"Webhook returned {response.status}")
+
+
+class InProcessSink:
+    """Hands each batch to the callbacks registered with `subscribe`."""
+
+    def publish(self, events):
+        for callback in list(_subscribers):
+            callback(events)
+
+
+def build_sink(kind, target=None):
+    """
+    Create a sink by name.
+
+    Args:
+        kind (str): One of 'file', 'webhook' or 'inprocess'.
+        target (str): File path or URL for the file and webhook sinks.
+
+    Returns:
+        object: A sink with a `publish(events)` method.
+    """
+    if kind == 'file':
+        return FileSink(target)
+    if kind == 'webhook':
+        return WebhookSink(target)
+    if kind == 'inprocess':
+        return InProcessSink()
+    raise ValueError(f"Unknown sink: {kind}")
+
+
+def relay_batch(sink, consumer, batch_size=100):
+    """
+    Publish the next batch of events for a consumer and advance its offset.
+
+    The offset moves only after the sink accepted the batch, so a crash in
+    between redelivers the batch (at-least-once delivery). Events past an id
+    that may still be uncommitted are held back (see `committed_prefix`).
+
+    Args:
+        sink: Sink to publish to.
+        consumer (str): Name of the consumer whose offset is tracked.
+        batch_size (int): Maximum events to publish.
+
+    Returns:
+        int: Number of events published.
+    """
+    offset, _ = ConsumerOffset.objects.get_or_create(consumer=consumer)
+    events = committed_prefix(
+        list(OutboxEvent.objects.filter(id__gt=offset.last_event_id).order_by('id')[:batch_size]),
+        offset.last_event_id,
+    )
+    if not events:
+        return 0
+
+    sink.publish([event.as_dict() for event in events])
+
+    with transaction.atomic():
+        ConsumerOffset.objects.filter(consumer=consumer, last_event_id__lt=events[-1].id) \
+            .update(last_event_id=events[-1].id)
+    return len(events)
@@ -0,0 +1,85 @@
+import logging
+import time
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """
+    Declare the most queries (and optionally DB time) a block or view may use.
+
+    Works as a decorator or a context manager. What happens on overrun depends on
+    settings.QUERY_BUDGET_MODE: 'raise' (tests), 'warn' (log, the default) or 'off'.
+    DB time is only checked when settings.QUERY_BUDGET_CHECK_TIME is true.
+
+    Usage:
+        @api_view(['GET'])
+        @query_budget(queries=2, db_ms=50)
+        @is_auth
+        def view(request): ...
+    """
+
+    def __init__(self, queries=None, db_ms=None, label=None, using='default'):
+        self.max_queries = queries
+        self.max_db_ms = db_ms
+        self.label = label
+        self.using = using
+        self.queries = 0
+        self.db_ms = 0.0
+        self.statements = []
+
+    def __call__(self, func):
+        if self.label is None:
+            self.label = func.__qualname__
+        return super().__call__(func)
+
+    def _recreate_cm(self):
+        # A fresh counter per call so concurrent requests don't share state
+        return type(self)(self.max_queries, self.max_db_ms, self.label, self.using)
+
+    def _record(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - start) * 1000
+            self.statements.append(sql)
+
+    def __enter__(self):
+        self._wrapper = connections[self.using].execute_wrapper(self._record)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._wrapper.__exit__(exc_type, exc, tb)
+        if exc_type is None:
+            self.check()
+        return False
+
+    def violations(self):
+        found = []
+        if self.max_queries is not None and self.queries > self.max_queries:
+            found.append(f"{self.queries} queries > budget of {self.max_queries}")
+        if (self.max_db_ms is not None and getattr(settings, 'QUERY_BUDGET_CHECK_TIME', True)
+                and self.db_ms > self.max_db_ms):
+            found.append(f"{self.db_ms:.1f} ms in the database > budget of {self.max_db_ms} ms")
+        return found
+
+    def check(self):
+        mode = getattr(settings, 'QUERY_BUDGET_MODE', 'warn')
+        found = self.violations()
+        if mode == 'off' or not found:
+            return
+        message = f"Query budget exceeded in {self.label or 'block'}: " + '; '.join(found)
+        if mode == 'raise':
+            raise QueryBudgetExceeded(message + '\n' + '\n'.join(self.statements))
+        logger.warning(message)
@@ -1,18 +1,16 @@
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
-from knox.models import User
 from rest_framework import serializers
-from rest_framework.exceptions import AuthenticationFailed
 
 from .models import Movie, Rating, MovieReport
-from rest_framework import status
-from rest_framework.response import Response
-from rest_framework.decorators import api_view
-from rest_framework import serializers
-from django.contrib.auth import authenticate
 
-from rest_framework import serializers
-from django.contrib.auth.models import User
+
+class UserSerializer(serializers.ModelSerializer):
+    # Same shape as knox's UserSerializer, without importing knox at startup
+    class Meta:
+        model = User
+        fields = (User.USERNAME_FIELD,)
 
 
 class SignupApiSerializers(serializers.ModelSerializer):
@@ -59,10 +57,17 @@ class MovieSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
 
         # Save without changing `updated_at` for rating changes only
-        instance.save(update_fields=[field for field in validated_data.keys() if field != 'average_rating'])
+        update_fields = [field for field in validated_data.keys() if field != 'average_rating']
+        # auto_now is only written when listed; delta sync relies on it moving
+        instance.save(update_fields=update_fields + ['updated_at'])
         return instance
 
 
+class MovieSyncSerializer(MovieSerializer):
+    class Meta(MovieSerializer.Meta):
+        fields = ['id'] + MovieSerializer.Meta.fields
+
+
 
 class RatingSerializer(serializers.ModelSerializer):
     score = serializers.IntegerField(
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CatalogueVersion, Movie, MovieTombstone
+
+
+# Queryset .update()/.delete() on Movie bypass these receivers; call
+# CatalogueVersion.bump() yourself after bulk writes.
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance, **kwargs):
+    CatalogueVersion.bump()
+
+
+@receiver(post_delete, sender=Movie)
+def movie_deleted(sender, instance, **kwargs):
+    MovieTombstone.objects.create(movie_id=instance.pk)
+    CatalogueVersion.bump()
@@ -0,0 +1,247 @@
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .archival import archive_resolved_reports
+from .models import CatalogueVersion, IdempotencyKey, Movie, MovieReport, Rating, RatingCounterShard, Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 300
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+
+_registry = {}
+
+
+def task(name):
+    """
+    Register a function as a background task.
+
+    The function receives the task's payload as keyword arguments and may run
+    more than once (after a retry or an expired lease), so it must be idempotent.
+    """
+    def register(fun):
+        _registry[name] = fun
+        return fun
+
+    return register
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=5):
+    """
+    Queue a task.
+
+    Args:
+        name (str): Registered task name.
+        payload (dict): Keyword arguments for the task.
+        delay (int): Seconds before the task may run.
+        max_attempts (int): Attempts before the task is marked FAILED.
+
+    Returns:
+        Task: The queued row.
+    """
+    if name not in _registry:
+        raise ValueError(f"Unknown task: {name}")
+    return Task.objects.create(
+        name=name, payload=payload or {}, max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def _claimable(now):
+    return Task.objects.filter(
+        Q(status='QUEUED', run_after__lte=now) | Q(status='RUNNING', lease_expires_at__lt=now)
+    )
+
+
+def claim(worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Claim the next runnable task, including RUNNING tasks whose lease expired.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED where supported; elsewhere (SQLite)
+    a conditional UPDATE on the candidate row decides which worker wins.
+
+    Returns:
+        Task: The claimed task, or None when nothing is runnable.
+    """
+    now = timezone.now()
+    lease = {
+        'status': 'RUNNING', 'locked_by': worker_id,
+        'lease_expires_at': now + timedelta(seconds=lease_seconds), 'updated_at': now,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            claimed = _claimable(now).order_by('run_after', 'id').select_for_update(skip_locked=True).first()
+            if claimed is None:
+                return None
+            Task.objects.filter(pk=claimed.pk).update(**lease)
+    else:
+        for _ in range(5):
+            candidate = _claimable(now).order_by('run_after', 'id').values_list('pk', flat=True).first()
+            if candidate is None:
+                return None
+            if _claimable(now).filter(pk=candidate).update(**lease):
+                break
+        else:
+            return None
+        claimed = Task(pk=candidate)
+
+    claimed.refresh_from_db()
+    return claimed
+
+
+def renew_lease(claimed, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Push a running task's lease forward.
+
+    Returns:
+        bool: False when the lease was lost to another worker.
+    """
+    now = timezone.now()
+    return bool(
+        Task.objects.filter(pk=claimed.pk, status='RUNNING', locked_by=claimed.locked_by)
+        .update(lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=now)
+    )
+
+
+def _heartbeat(claimed, lease_seconds, finished):
+    # Renew at a third of the lease so a slow beat doesn't let it expire
+    try:
+        while not finished.wait(lease_seconds / 3):
+            if not renew_lease(claimed, lease_seconds):
+                logger.warning("task %s #%s lost its lease", claimed.name, claimed.pk)
+                return
+    finally:
+        connection.close()
+
+
+def run_task(claimed, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Execute a claimed task and record success, a retry with backoff, or failure.
+
+    The lease is renewed while the task runs. The outcome is only written while
+    this worker still holds the task, so a worker whose lease expired can't
+    overwrite the state of the worker that re-claimed it.
+    """
+    attempts = claimed.attempts + 1
+    held = Task.objects.filter(pk=claimed.pk, status='RUNNING', locked_by=claimed.locked_by)
+    finished = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(claimed, lease_seconds, finished), daemon=True)
+    heartbeat.start()
+    try:
+        _registry[claimed.name](**claimed.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("task %s #%s failed (attempt %s)", claimed.name, claimed.pk, attempts)
+        if attempts >= claimed.max_attempts:
+            outcome = {'status': 'FAILED'}
+        else:
+            backoff = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+            outcome = {'status': 'QUEUED', 'run_after': timezone.now() + timedelta(seconds=backoff)}
+        outcome['last_error'] = error
+        succeeded = False
+    else:
+        outcome = {'status': 'DONE'}
+        succeeded = True
+    finally:
+        finished.set()
+        heartbeat.join()
+
+    if not held.update(attempts=attempts, lease_expires_at=None, updated_at=timezone.now(), **outcome):
+        logger.warning("task %s #%s finished after losing its lease; outcome dropped", claimed.name, claimed.pk)
+    return succeeded
+
+
+def run_pending(worker_id, lease_seconds=DEFAULT_LEASE_SECONDS, limit=None):
+    """
+    Claim and run tasks until none are runnable (or `limit` tasks ran).
+
+    Returns:
+        int: Number of tasks run.
+    """
+    ran = 0
+    while limit is None or ran < limit:
+        claimed = claim(worker_id, lease_seconds)
+        if claimed is None:
+            break
+        run_task(claimed, lease_seconds)
+        ran += 1
+    return ran
+
+
+@task('rebuild_rating_aggregates')
+def rebuild_rating_aggregates(movie_ids=None, batch_size=500):
+    """
+    Recompute rating counter shards and Movie aggregates from the Rating table.
+    """
+    movies = Movie.objects.order_by('id')
+    if movie_ids:
+        movies = movies.filter(id__in=movie_ids)
+
+    last_id = 0
+    while True:
+        batch = list(movies.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1]
+        with transaction.atomic():
+            # Votes update these shard rows, so they wait for the rebuild instead
+            # of landing between the read below and the rewrite
+            list(RatingCounterShard.objects.select_for_update().filter(movie_id__in=batch).values_list('id'))
+            totals = {
+                row['movie_id']: row
+                for row in Rating.objects.filter(movie_id__in=batch).values('movie_id')
+                .annotate(score_sum=Sum('score'), rating_count=Count('id'))
+            }
+            RatingCounterShard.objects.filter(movie_id__in=batch).delete()
+            RatingCounterShard.objects.bulk_create([
+                RatingCounterShard(
+                    movie_id=movie_id, shard=0, score_sum=row['score_sum'], rating_count=row['rating_count'],
+                )
+                for movie_id, row in totals.items()
+            ])
+            now = timezone.now()
+            Movie.objects.bulk_update(
+                [
+                    Movie(
+                        id=movie_id, updated_at=now,
+                        average_rating=row['score_sum'] / row['rating_count'] if row else 0.0,
+                        total_rating=row['rating_count'] if row else 0,
+                    )
+                    for movie_id, row in ((movie_id, totals.get(movie_id)) for movie_id in batch)
+                ],
+                ['average_rating', 'total_rating', 'updated_at'],
+            )
+    CatalogueVersion.bump()
+
+
+@task('purge_resolved_reports')
+def purge_resolved_reports(days=90, batch_size=1000):
+    """
+    Delete APPROVED/REJECTED reports older than `days`, `batch_size` rows per transaction.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    resolved = MovieReport.objects.filter(status__in=['APPROVED', 'REJECTED'], reported_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(resolved.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            deleted += MovieReport.objects.filter(id__in=ids).delete()[0]
+
+
+@task('archive_resolved_reports')
+def archive_reports(retention_days=30, batch_size=1000, path=None):
+    return archive_resolved_reports(retention_days, batch_size, path)
+
+
+@task('purge_idempotency_keys')
+def purge_idempotency_keys(batch_size=1000):
+    return IdempotencyKey.purge_expired(batch_size)
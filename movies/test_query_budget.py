@@ -0,0 +1,175 @@
+"""
+N+1 guards: every URL in movies/urls.py (and the admin changelists) must issue the
+same number of queries whether the tables hold 10 rows or 10,000.
+
+The 10,000-row dataset is built once per class; each endpoint is its own test,
+compared against the count recorded at 10 rows before the tables were grown.
+"""
+
+import logging
+
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .factories import bulk_movies, bulk_ratings, bulk_reports, bulk_users, make_movie, make_user
+from .models import ArchivedMovieReport, Movie, MovieReport, OutboxEvent
+from .query_budget import QueryBudgetExceeded, query_budget
+from .trending import refresh_rankings
+from .urls import urlpatterns
+
+SIZES = (10, 10000)
+ADMIN_CHANGELISTS = ('moviereport', 'movie', 'rating')
+
+
+def _fresh_movie(case):
+    # Rate/report/update targets a movie the user has not touched yet
+    case.target = make_movie(created_by=case.user).id
+    return {'movie_id': case.target}
+
+
+def _pending_report(case):
+    movie = make_movie(created_by=case.admin)
+    report, _ = MovieReport.file(movie, case.user, 'spam')
+    return report
+
+
+# url name -> (method, client, url kwargs builder, request data)
+ENDPOINTS = {
+    'register_user': ('post', None, None, lambda case: {
+        'username': f'signup-{Movie.objects.count()}', 'email': 'signup@example.com', 'password': 'password',
+    }),
+    'login_view': ('post', None, None, lambda case: {'username': case.user.username}),
+    'list_all_movies': ('get', 'user', None, None),
+    'sync_movies': ('get', 'user', None, None),
+    'list_trending_movies': ('get', 'user', None, None),
+    'list_user_movies': ('get', 'user', None, None),
+    'list_user_ratings': ('get', 'user', None, None),
+    'list_user_reports': ('get', 'user', None, None),
+    'user_activity_summary': ('get', 'user', None, None),
+    'view_movie_detail': ('get', 'user', lambda case: {'movie_id': case.movies[-1].id}, None),
+    'create_movie': ('post', 'user', None, lambda case: {
+        'title': 'New', 'description': 'New', 'released_at': timezone.now(), 'duration': 90,
+        'genre': 'Drama', 'language': 'English',
+    }),
+    'update_movie': ('put', 'user', _fresh_movie, lambda case: {'title': 'Renamed'}),
+    'rate_movie': ('post', 'user', _fresh_movie, lambda case: {'score': 4}),
+    'report_movie': ('post', 'user', _fresh_movie, lambda case: {'movie': case.target, 'reason': 'spam'}),
+    'manage_reported_movies': ('get', 'admin', None, None),
+    'manage_movie_report': ('post', 'admin', lambda case: {'report_id': _pending_report(case).id},
+                            lambda case: {'status': 'APPROVED'}),
+    'list_archived_reports': ('get', 'admin', None, None),
+    'movie_events': ('get', 'admin', None, lambda case: {'wait': 0}),
+}
+
+
+class QueryBudgetTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        cls.admin = make_user(is_staff=True, is_superuser=True)
+        cls.movies = []
+        cls.grow_to(SIZES[0])
+        # Each measurement is rolled back so the large dataset starts from the same rows
+        cls.baseline = {}
+        for name in list(ENDPOINTS) + [f'admin:{model}' for model in ADMIN_CHANGELISTS]:
+            with transaction.atomic():
+                cls.baseline[name] = cls.measure(name)
+                transaction.set_rollback(True)
+        cls.grow_to(SIZES[-1])
+
+    @classmethod
+    def grow_to(cls, size):
+        """
+        Bring every table the endpoints read to `size` rows, including the test user's own.
+        """
+        added = size - len(cls.movies)
+        movies = bulk_movies(added, created_by=cls.user)
+        users = [cls.user] + bulk_users(min(added, 100))
+        bulk_ratings(movies, users)
+        bulk_reports(movies, users)
+        ArchivedMovieReport.objects.bulk_create([
+            ArchivedMovieReport(id=10 ** 9 + len(cls.movies) + i, movie_id=movie.id, user_id=cls.user.id,
+                                reason='spam', status='APPROVED', reported_at=timezone.now())
+            for i, movie in enumerate(movies)
+        ])
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(event_type='movie.created', aggregate_id=movie.id) for movie in movies
+        ])
+        refresh_rankings()
+        cls.movies += movies
+
+    @classmethod
+    def measure(cls, name):
+        """
+        (status code, query count) for one request to the URL or admin changelist `name`.
+        """
+        if name.startswith('admin:'):
+            client = Client()
+            client.force_login(cls.admin)
+            url, request = reverse(f'admin:movies_{name[6:]}_changelist'), (client.get, None)
+        else:
+            method, who, kwargs, data = ENDPOINTS[name]
+            client = APIClient()
+            if who:
+                client.credentials(HTTP_AUTH_ID=str(getattr(cls, who).id))
+            url = reverse(name, kwargs=kwargs(cls) if kwargs else None)
+            request = (getattr(client, method), data(cls) if data else None)
+        with CaptureQueriesContext(connection) as queries:
+            response = request[0](url, request[1])
+        return response.status_code, len(queries)
+
+    def assert_constant(self, name):
+        small_status, small = self.baseline[name]
+        large_status, large = self.measure(name)
+        for size, code in zip(SIZES, (small_status, large_status)):
+            self.assertTrue(200 <= code < 300, f"{name} returned {code} at {size} rows")
+        self.assertEqual(small, large, f"{name}: {dict(zip(SIZES, (small, large)))}")
+
+    def test_every_url_has_a_case(self):
+        self.assertEqual(set(ENDPOINTS), {pattern.name for pattern in urlpatterns})
+
+
+def _constant_queries_test(name):
+    def test(self):
+        self.assert_constant(name)
+    return test
+
+
+for _name in list(ENDPOINTS) + [f'admin:{model}' for model in ADMIN_CHANGELISTS]:
+    setattr(QueryBudgetTestCase, f"test_{_name.replace(':', '_')}_query_count_is_constant",
+            _constant_queries_test(_name))
+
+
+class QueryBudgetDecoratorTestCase(TestCase):
+
+    def test_raise_mode_reports_the_statements(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, '2 queries > budget of 1'):
+            with query_budget(queries=1, label='two reads'):
+                list(Movie.objects.all())
+                list(MovieReport.objects.all())
+
+    @override_settings(QUERY_BUDGET_MODE='warn')
+    def test_warn_mode_logs(self):
+        with self.assertLogs('movies.query_budget', logging.WARNING) as logs:
+            with query_budget(queries=0):
+                list(Movie.objects.all())
+        self.assertIn('1 queries > budget of 0', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGET_CHECK_TIME=True)
+    def test_db_time_budget(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'ms in the database'):
+            with query_budget(db_ms=-1):
+                list(Movie.objects.all())
+
+    def test_decorator_counts_each_call_separately(self):
+        @query_budget(queries=1)
+        def read():
+            return list(Movie.objects.all())
+
+        read()
+        read()
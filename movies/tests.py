@@ -1,6 +1,38 @@
-from django.test import TestCase
+import base64
+import gzip
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
-from .models import Movie, Rating
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .archival import archive_resolved_reports
+from .compression import negotiate_encoding
+from .factories import make_movie
+from .management.commands.profile_imports import parse_importtime
+from .management.commands.run_workers import stop_workers
+from .models import ArchivedMovieReport, CatalogueVersion, Movie, Rating, MovieReport, MovieReportSummary, \
+    OutboxEvent, Task, ConsumerOffset, RatingActivityBucket, RatingIngestWatermark
+from .outbox import build_sink, relay_batch, subscribe, unsubscribe
+from .paginators import LargeTablePaginator
+from .tasks import claim, enqueue, rebuild_rating_aggregates, renew_lease, run_pending, run_task
+from .trending import compute_scores, ingest_ratings
 
 User = get_user_model()
 
@@ -17,8 +49,8 @@ class MovieTestCase(TestCase):
         cls.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='adminpass')
 
         # Create two movies: one for each user
-        cls.movie1 = Movie.objects.create(title='Movie 1', description='Description 1', created_by=cls.user1)
-        cls.movie2 = Movie.objects.create(title='Movie 2', description='Description 2', created_by=cls.user2)
+        cls.movie1 = make_movie(title='Movie 1', description='Description 1', created_by=cls.user1)
+        cls.movie2 = make_movie(title='Movie 2', description='Description 2', created_by=cls.user2)
 
     def test_movie_creation(self):
         # Ensure each user has one movie created
@@ -55,3 +87,627 @@ class MovieTestCase(TestCase):
         self.assertTrue(self.movie2.reported)
 
 
+class ProfileImportsTestCase(SimpleTestCase):
+
+    def test_parse_importtime(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     jwt.exceptions\n"
+            "import time:       300 |        420 |   jwt\n"
+            "import time:        50 |        470 | movie_management.wsgi\n"
+        )
+        rows = parse_importtime(output)
+        self.assertEqual(rows[0], ('jwt.exceptions', 120, 120, 2))
+        self.assertEqual(rows[-1], ('movie_management.wsgi', 50, 470, 0))
+
+
+class MovieSyncTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='syncer', password='password1')
+        cls.movie = make_movie(created_by=cls.user, title='Movie 1')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTH_ID=str(self.user.id))
+
+    def test_list_returns_304_for_matching_etag(self):
+        response = self.client.get(reverse('list_all_movies'))
+        etag = response['ETag']
+        response = self.client.get(reverse('list_all_movies'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.save()
+        response = self.client.get(reverse('list_all_movies'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_version_is_bumped_after_commit(self):
+        before = CatalogueVersion.current()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.movie.save()
+            self.assertEqual(CatalogueVersion.current(), before)
+        callbacks[0]()
+        self.assertEqual(CatalogueVersion.current(), before + 1)
+
+    # No settle window, so the cursor moves right up to the last change
+    @override_settings(ID_GAP_TIMEOUT=0)
+    def test_sync_returns_changes_and_deletions(self):
+        response = self.client.get(reverse('sync_movies'))
+        self.assertEqual([movie['id'] for movie in response.data['changed']], [self.movie.id])
+        since = response.data['since']
+
+        response = self.client.get(reverse('sync_movies'), {'since': since})
+        self.assertEqual(response.data['changed'], [])
+        self.assertEqual(response.data['deleted'], [])
+
+        movie_id = self.movie.id
+        self.movie.delete()
+        response = self.client.get(reverse('sync_movies'), {'since': since})
+        self.assertEqual(response.data['deleted'], [movie_id])
+
+    def test_sync_rejects_bad_token(self):
+        response = self.client.get(reverse('sync_movies'), {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, 400)
+        for cursor in (['2024-01-01T00:00:00+00:00', float('inf')], ['2024-01-01T00:00:00', 1]):
+            token = base64.urlsafe_b64encode(json.dumps({'m': cursor, 't': cursor}).encode()).decode()
+            response = self.client.get(reverse('sync_movies'), {'since': token})
+            self.assertEqual(response.status_code, 400)
+
+    def test_sync_cursor_stays_behind_late_commits(self):
+        since = self.client.get(reverse('sync_movies')).data['since']
+        late = make_movie(created_by=self.user, title='Late')
+        # Saved before the first sync read, but committed after it
+        Movie.objects.filter(pk=late.pk).update(updated_at=timezone.now() - timedelta(seconds=5))
+
+        response = self.client.get(reverse('sync_movies'), {'since': since})
+        self.assertIn(late.id, [movie['id'] for movie in response.data['changed']])
+        self.assertFalse(response.data['has_more'])
+
+
+class OutboxTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='rater', password='password1')
+        cls.admin = User.objects.create_superuser(username='relay', password='adminpass')
+        cls.movie = make_movie(created_by=cls.user, title='Movie 1')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTH_ID=str(self.user.id))
+        self.staff_client = APIClient()
+        self.staff_client.credentials(HTTP_AUTH_ID=str(self.admin.id))
+
+    def test_writes_append_events(self):
+        self.client.post(reverse('rate_movie', args=[self.movie.id]), {'score': 4})
+        self.client.post(reverse('report_movie', args=[self.movie.id]), {'movie': self.movie.id, 'reason': 'spam'})
+        types = list(OutboxEvent.objects.order_by('id').values_list('event_type', flat=True))
+        self.assertEqual(types, ['rating.saved', 'report.created'])
+
+    def test_relay_delivers_once_per_consumer(self):
+        OutboxEvent.record('movie.created', self.movie.id)
+        received = []
+        subscribe(received.extend)
+        self.addCleanup(unsubscribe, received.extend)
+
+        sink = build_sink('inprocess')
+        self.assertEqual(relay_batch(sink, 'test'), 1)
+        self.assertEqual(relay_batch(sink, 'test'), 0)
+        self.assertEqual(received[0]['type'], 'movie.created')
+        self.assertEqual(relay_batch(sink, 'other'), 1)
+
+    def test_relay_waits_for_ids_committed_out_of_order(self):
+        first = OutboxEvent.record('movie.created', self.movie.id)
+        # first.id + 1 belongs to a transaction that is still open when first.id + 2 commits
+        OutboxEvent.objects.create(id=first.id + 2, event_type='movie.updated', aggregate_id=self.movie.id)
+        received = []
+        subscribe(received.extend)
+        self.addCleanup(unsubscribe, received.extend)
+
+        sink = build_sink('inprocess')
+        self.assertEqual(relay_batch(sink, 'test'), 1)
+        self.assertEqual(relay_batch(sink, 'test'), 0)
+        response = self.staff_client.get(reverse('movie_events'), {'after': first.id, 'wait': 0})
+        self.assertEqual(response.data['events'], [])
+
+        OutboxEvent.objects.create(id=first.id + 1, event_type='movie.updated', aggregate_id=self.movie.id)
+        self.assertEqual(relay_batch(sink, 'test'), 2)
+        self.assertEqual([event['id'] for event in received], [first.id, first.id + 1, first.id + 2])
+
+    def test_relay_skips_gap_left_by_a_rollback(self):
+        first = OutboxEvent.record('movie.created', self.movie.id)
+        OutboxEvent.objects.create(id=first.id + 2, event_type='movie.updated', aggregate_id=self.movie.id)
+        OutboxEvent.objects.filter(id=first.id + 2).update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(relay_batch(build_sink('inprocess'), 'test'), 2)
+
+    def test_events_endpoint(self):
+        event = OutboxEvent.record('movie.created', self.movie.id)
+        response = self.staff_client.get(reverse('movie_events'), {'after': 0, 'wait': 0})
+        self.assertEqual(response.data['last_id'], event.id)
+        response = self.staff_client.get(reverse('movie_events'), {'after': event.id, 'wait': 0})
+        self.assertEqual(response.data['events'], [])
+
+    def test_events_endpoint_is_staff_only(self):
+        OutboxEvent.record('report.created', self.movie.id, {'report_id': 1, 'user_id': self.user.id})
+        response = self.client.get(reverse('movie_events'), {'wait': 0})
+        self.assertEqual(response.status_code, 403)
+
+    def test_events_endpoint_rejects_non_finite_wait(self):
+        for wait in ('nan', 'inf', '-inf'):
+            response = self.staff_client.get(reverse('movie_events'), {'wait': wait})
+            self.assertEqual(response.status_code, 400)
+
+
+class UserActivityTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='active', password='password1')
+        cls.movies = [
+            make_movie(created_by=cls.user, title=f'Movie {i}')
+            for i in range(3)
+        ]
+        for movie, score in zip(cls.movies, [2, 4, 5]):
+            Rating.objects.create(movie=movie, user=cls.user, score=score)
+            MovieReport.objects.create(movie=movie, user=cls.user, reason='spam')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTH_ID=str(self.user.id))
+
+    def test_ratings_are_cursor_paginated(self):
+        response = self.client.get(reverse('list_user_ratings'), {'limit': 2})
+        self.assertEqual([row['score'] for row in response.data['results']], [2, 4])
+        response = self.client.get(reverse('list_user_ratings'), {'limit': 2, 'cursor': response.data['next_cursor']})
+        self.assertEqual([row['score'] for row in response.data['results']], [5])
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_reports_are_cursor_paginated(self):
+        response = self.client.get(reverse('list_user_reports'), {'limit': 2})
+        seen = [row['id'] for row in response.data['results']]
+        response = self.client.get(reverse('list_user_reports'), {'limit': 2, 'cursor': response.data['next_cursor']})
+        seen += [row['id'] for row in response.data['results']]
+        self.assertEqual(sorted(seen), sorted(MovieReport.objects.values_list('id', flat=True)))
+
+    def test_tampered_cursors_are_rejected(self):
+        cases = [
+            ('list_user_ratings', [[1], [2]]),
+            ('list_user_ratings', [True, 1]),
+            ('list_user_reports', ['x', 1]),
+            ('list_user_reports', [{'dt': '2024-01-01T00:00:00'}, 1]),
+            ('list_user_reports', [1]),
+        ]
+        for name, values in cases:
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            with self.subTest(name=name, values=values):
+                response = self.client.get(reverse(name), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+
+    def test_activity_summary(self):
+        response = self.client.get(reverse('user_activity_summary'))
+        self.assertEqual(response.data, {
+            'movies_created': 3, 'ratings_given': 3, 'average_score_given': 11 / 3, 'reports_filed': 3,
+        })
+
+
+@override_settings(REPORT_COLLAPSE_THRESHOLD=2)
+class ReportDedupTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f'reporter{i}', password='password1') for i in range(3)]
+        cls.admin = User.objects.create_superuser(username='moderator', password='adminpass')
+        cls.movie = make_movie(created_by=cls.admin, title='Movie 1')
+
+    def report(self, user, reason='spam'):
+        client = APIClient()
+        client.credentials(HTTP_AUTH_ID=str(user.id))
+        return client.post(reverse('report_movie', args=[self.movie.id]), {'movie': self.movie.id, 'reason': reason})
+
+    def test_repeat_reports_are_deduplicated(self):
+        self.assertEqual(self.report(self.users[0]).status_code, 201)
+        self.assertEqual(self.report(self.users[0], 'still spam').status_code, 200)
+        self.assertEqual(MovieReport.objects.get().reason, 'still spam')
+        self.assertEqual(self.movie.report_summary.pending_count, 1)
+
+    def test_queue_collapses_report_waves(self):
+        for user in self.users:
+            self.report(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTH_ID=str(self.admin.id))
+
+        response = client.get(reverse('manage_reported_movies'))
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['pending_count'], 3)
+
+        client.patch(reverse('manage_reported_movies'), {'movie_id': self.movie.id, 'status': 'REJECTED'})
+        self.assertEqual(client.get(reverse('manage_reported_movies')).data, [])
+        self.assertEqual(MovieReportSummary.objects.get(movie=self.movie).pending_count, 0)
+
+    def test_moderating_a_single_report(self):
+        self.report(self.users[0])
+        report = MovieReport.objects.get()
+        url = reverse('manage_movie_report', args=[report.id])
+        client = APIClient()
+        client.credentials(HTTP_AUTH_ID=str(self.users[1].id))
+        self.assertEqual(client.post(url, {'status': 'APPROVED'}).status_code, 403)
+
+        client.credentials(HTTP_AUTH_ID=str(self.admin.id))
+        self.assertEqual(client.post(url, {'status': 'PENDING'}).status_code, 400)
+        self.assertEqual(client.post(url, {'status': 'APPROVED'}).status_code, 200)
+        report.refresh_from_db()
+        self.assertEqual(report.status, 'APPROVED')
+        self.assertEqual(MovieReportSummary.objects.get(movie=self.movie).pending_count, 0)
+        self.assertTrue(OutboxEvent.objects.filter(event_type='report.status_changed').exists())
+
+    def test_admin_changelist_edits_keep_the_counter(self):
+        for user in self.users:
+            self.report(user)
+        reports = list(MovieReport.objects.order_by('-pk'))
+        data = {'form-TOTAL_FORMS': len(reports), 'form-INITIAL_FORMS': len(reports), '_save': 'Save'}
+        for i, report in enumerate(reports):
+            data.update({f'form-{i}-id': report.id, f'form-{i}-status': 'APPROVED'})
+
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin:movies_moviereport_changelist'), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(MovieReportSummary.objects.get(movie=self.movie).pending_count, 0)
+        self.assertEqual(OutboxEvent.objects.filter(event_type='report.status_changed').count(), len(reports))
+
+        self.client.post(reverse('admin:movies_moviereport_delete', args=[reports[0].id]), {'post': 'yes'})
+        self.assertEqual(MovieReportSummary.objects.get(movie=self.movie).total_count, 2)
+
+
+class CompressionTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', password='password1')
+        for i in range(20):
+            make_movie(created_by=cls.user, title=f'Movie {i}')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTH_ID=str(self.user.id))
+
+    def test_negotiate_encoding(self):
+        encoders = {'br': None, 'gzip': None}
+        self.assertEqual(negotiate_encoding('gzip, br', encoders), 'br')
+        self.assertEqual(negotiate_encoding('gzip, br;q=0', encoders), 'gzip')
+        self.assertIsNone(negotiate_encoding('identity', encoders))
+
+    def test_gzip_list_response(self):
+        response = self.client.get(reverse('list_all_movies'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 20)
+
+        response = self.client.get(reverse('list_all_movies'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get(reverse('list_all_movies'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class LargeTableAdminTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='adminpass')
+        cls.movies = [
+            make_movie(created_by=cls.admin, title=f'Movie {i}')
+            for i in range(25)
+        ]
+        Rating.objects.create(movie=cls.movies[0], user=cls.admin, score=3)
+
+    def test_changelists_render(self):
+        self.client.force_login(self.admin)
+        for name in ('admin:movies_movie_changelist', 'admin:movies_rating_changelist'):
+            self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+
+    @mock.patch('movies.paginators.DEEP_PAGE_OFFSET', 0)
+    def test_deep_pages_match_offset_pagination(self):
+        queryset = Movie.objects.order_by('-pk')
+        expected = [list(page) for page in (Paginator(queryset, 10).page(n) for n in (1, 2, 3))]
+        paginator = LargeTablePaginator(queryset, 10)
+        # Pages 2 and 3 seek from the boundary cached by the page before
+        self.assertEqual([list(paginator.page(n)) for n in (1, 2, 3)], expected)
+
+
+class ShardedRatingTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='voter', password='password1')
+        cls.movie = make_movie(created_by=cls.user, title='Movie 1')
+
+    def test_single_shard_folds_on_write(self):
+        Rating.objects.create(movie=self.movie, user=self.user, score=4)
+        Rating.objects.create(movie=self.movie, user=self.user, score=2)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.average_rating, self.movie.total_rating), (3.0, 2))
+
+    def test_widened_movie_folds_periodically(self):
+        call_command('set_rating_shards', self.movie.id, 8, stdout=io.StringIO())
+        self.movie.refresh_from_db()
+        for score in [5, 4, 3, 4]:
+            Rating.objects.create(movie=self.movie, user=self.user, score=score)
+
+        self.assertEqual(self.movie.live_rating(), (4.0, 4))
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.total_rating, 0)
+
+        call_command('fold_rating_counters', stdout=io.StringIO())
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.average_rating, self.movie.total_rating), (4.0, 4))
+
+    def test_admin_deletes_take_votes_out_of_the_counters(self):
+        admin = User.objects.create_superuser(username='rating-admin', password='adminpass')
+        ratings = [Rating.objects.create(movie=self.movie, user=self.user, score=score) for score in (5, 3, 1)]
+        self.client.force_login(admin)
+
+        self.client.post(reverse('admin:movies_rating_delete', args=[ratings[0].id]), {'post': 'yes'})
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.average_rating, self.movie.total_rating), (2.0, 2))
+
+        self.client.post(reverse('admin:movies_rating_changelist'), {
+            'action': 'delete_selected', 'post': 'yes', '_selected_action': [r.id for r in ratings[1:]],
+        })
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.average_rating, self.movie.total_rating), (0.0, 0))
+        self.assertEqual(self.movie.live_rating(), (0.0, 0))
+
+        response = self.client.get(reverse('admin:movies_rating_change', args=[
+            Rating.objects.create(movie=self.movie, user=self.user, score=4).id,
+        ]))
+        self.assertNotIn('name="movie"', response.content.decode())
+
+
+class TrendingTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='fan', password='password1')
+        cls.old = make_movie(created_by=cls.user, title='Classic', genre='Drama', language='English')
+        cls.new = make_movie(created_by=cls.user, title='Release', genre='Action', language='Hindi')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTH_ID=str(self.user.id))
+
+    def test_recent_activity_outranks_old_activity(self):
+        now = timezone.now()
+        scores = compute_scores([
+            (self.old.id, now - timedelta(days=5), 100),
+            (self.new.id, now - timedelta(hours=1), 30),
+        ], now)
+        self.assertNotIn(self.old.id, scores['24h'])
+        self.assertGreater(scores['7d'][self.new.id], scores['7d'][self.old.id])
+
+    def test_trending_endpoint_filters_materialized_ranking(self):
+        for score in [5, 4]:
+            Rating.objects.create(movie=self.new, user=self.user, score=score)
+        Rating.objects.create(movie=self.old, user=self.user, score=3)
+        call_command('refresh_trending', stdout=io.StringIO())
+
+        response = self.client.get(reverse('list_trending_movies'))
+        self.assertEqual([movie['id'] for movie in response.data], [self.new.id, self.old.id])
+        response = self.client.get(reverse('list_trending_movies'), {'genre': 'Drama', 'window': '7d'})
+        self.assertEqual([movie['id'] for movie in response.data], [self.old.id])
+        self.assertEqual(self.client.get(reverse('list_trending_movies'), {'window': '2w'}).status_code, 400)
+
+        # A second run only ingests new ratings
+        self.assertEqual(ingest_ratings(), 0)
+
+    def test_ingest_waits_for_ratings_committed_out_of_order(self):
+        first = Rating.objects.create(movie=self.new, user=self.user, score=5)
+        self.assertEqual(ingest_ratings(), 1)
+        # first.id + 1 is still uncommitted when first.id + 2 commits
+        Rating.objects.create(id=first.id + 2, movie=self.old, user=self.user, score=3)
+        self.assertEqual(ingest_ratings(), 0)
+
+        Rating.objects.create(id=first.id + 1, movie=self.old, user=self.user, score=4)
+        self.assertEqual(ingest_ratings(), 2)
+        self.assertEqual(RatingIngestWatermark.objects.get().last_rating_id, first.id + 2)
+        self.assertFalse(ConsumerOffset.objects.exists())
+
+    def test_ratings_backfilled_before_the_watermark_are_not_ingested(self):
+        # Ratings from before migration 0006 carry its timestamp as rated_at
+        for score in [5, 5, 4]:
+            Rating.objects.create(movie=self.old, user=self.user, score=score)
+        RatingIngestWatermark.objects.all().delete()
+        migration = importlib.import_module('movies.migrations.0014_start_rating_watermark')
+        migration.start_after_backfilled_ratings(django_apps, None)
+
+        self.assertEqual(ingest_ratings(), 0)
+        Rating.objects.create(movie=self.new, user=self.user, score=3)
+        self.assertEqual(ingest_ratings(), 1)
+        self.assertEqual(list(RatingActivityBucket.objects.values_list('movie_id', flat=True)), [self.new.id])
+
+
+class IdempotencyTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='retrier', password='password1')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTH_ID=str(self.user.id))
+        self.payload = {
+            'title': 'Retry', 'description': 'Description', 'released_at': timezone.now().isoformat(),
+            'duration': 90, 'genre': 'Drama', 'language': 'English',
+        }
+
+    def test_retry_is_replayed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(reverse('create_movie'), self.payload, HTTP_IDEMPOTENCY_KEY='abc')
+        second = self.client.post(reverse('create_movie'), self.payload, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Movie.objects.filter(title='Retry').count(), 1)
+
+    def test_replay_from_database_and_fingerprint_check(self):
+        self.client.post(reverse('create_movie'), self.payload, HTTP_IDEMPOTENCY_KEY='def')
+        # No on-commit callback ran, so this replay comes from the table
+        response = self.client.post(reverse('create_movie'), self.payload, HTTP_IDEMPOTENCY_KEY='def')
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+
+        self.payload['title'] = 'Other'
+        response = self.client.post(reverse('create_movie'), self.payload, HTTP_IDEMPOTENCY_KEY='def')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Movie.objects.count(), 1)
+
+
+class TaskQueueTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='worker', password='password1')
+        cls.movie = make_movie(created_by=cls.user, title='Movie 1')
+
+    def test_rebuild_rating_aggregates(self):
+        Rating.objects.create(movie=self.movie, user=self.user, score=4)
+        Rating.objects.filter(movie=self.movie).update(score=2)
+        enqueue('rebuild_rating_aggregates')
+        self.assertEqual(run_pending('test'), 1)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.average_rating, self.movie.total_rating), (2.0, 1))
+
+    def test_rebuild_writes_each_batch_at_once(self):
+        movies = [self.movie] + [make_movie(created_by=self.user) for _ in range(4)]
+        for movie in movies:
+            Rating.objects.create(movie=movie, user=self.user, score=3)
+        with self.assertNumQueries(9):
+            # batch ids, savepoint, shard lock, totals, shard delete + insert, movie update,
+            # release, empty batch: independent of the batch size
+            rebuild_rating_aggregates(batch_size=5)
+        self.assertEqual(
+            set(Movie.objects.filter(pk__in=[m.pk for m in movies]).values_list('average_rating', 'total_rating')),
+            {(3.0, 1)},
+        )
+
+    def test_purge_resolved_reports(self):
+        old = timezone.now() - timedelta(days=100)
+        MovieReport.objects.create(movie=self.movie, user=self.user, reason='spam', status='REJECTED')
+        MovieReport.objects.update(reported_at=old)
+        enqueue('purge_resolved_reports', {'days': 90, 'batch_size': 1})
+        run_pending('test')
+        self.assertFalse(MovieReport.objects.exists())
+
+    def test_failed_task_is_retried_with_backoff(self):
+        queued = enqueue('purge_resolved_reports', {'unexpected': True}, max_attempts=2)
+        with self.assertLogs('movies.tasks', 'ERROR'):
+            run_pending('test')
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('QUEUED', 1))
+        self.assertGreater(queued.run_after, timezone.now())
+        # Not runnable until the backoff has passed
+        self.assertIsNone(claim('test'))
+
+        Task.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        with self.assertLogs('movies.tasks', 'ERROR'):
+            run_pending('test')
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'FAILED')
+
+
+    def test_expired_lease_does_not_overwrite_the_new_holder(self):
+        queued = enqueue('purge_resolved_reports')
+        first = claim('worker-a')
+        Task.objects.filter(pk=queued.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        second = claim('worker-b')
+        self.assertEqual(second.pk, queued.pk)
+
+        self.assertFalse(renew_lease(first))
+        with self.assertLogs('movies.tasks', 'WARNING'):
+            run_task(first)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.locked_by), ('RUNNING', 'worker-b'))
+
+        self.assertTrue(renew_lease(second, lease_seconds=600))
+        run_task(second)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'DONE')
+
+
+def _stuck_worker(stop):
+    # Like worker_loop: SIGTERM only sets a flag, and the current task never returns
+    signal.signal(signal.SIGTERM, lambda signum, frame: None)
+    time.sleep(60)
+
+
+class WorkerShutdownTestCase(SimpleTestCase):
+
+    def test_slow_worker_is_killed_after_the_timeout(self):
+        # `manage.py test --parallel` runs tests in daemonic processes, which can't start workers
+        if multiprocessing.current_process().daemon:
+            self.skipTest("needs to start a worker process")
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        proc = context.Process(target=_stuck_worker, args=(stop,))
+        proc.start()
+        self.addCleanup(proc.kill)
+
+        started = time.monotonic()
+        self.assertEqual(stop_workers([proc], stop, timeout=0.5), 1)
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertFalse(proc.is_alive())
+        self.assertEqual(proc.exitcode, -signal.SIGKILL)
+
+
+class ReportArchivalTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='archivist', password='adminpass')
+        cls.users = [User.objects.create_user(username=f'user{i}', password='password1') for i in range(3)]
+        cls.movie = make_movie(created_by=cls.admin, title='Movie 1')
+        for user, report_status in zip(cls.users, ['APPROVED', 'REJECTED', 'PENDING']):
+            MovieReport.objects.create(movie=cls.movie, user=user, reason='spam', status=report_status)
+        MovieReport.objects.update(reported_at=timezone.now() - timedelta(days=60))
+
+    def test_batch_is_selected_inside_its_transaction(self):
+        with CaptureQueriesContext(connection) as queries:
+            archive_resolved_reports(retention_days=30, batch_size=10)
+        statements = [query['sql'] for query in queries]
+        select = next(i for i, sql in enumerate(statements) if sql.startswith('SELECT') and 'moviereport' in sql)
+        delete = next(i for i, sql in enumerate(statements) if sql.startswith('DELETE'))
+        self.assertTrue(statements[select - 1].startswith('SAVEPOINT'))
+        self.assertFalse(any(sql.startswith('RELEASE') for sql in statements[select:delete]))
+
+    def test_archive_to_table_and_query(self):
+        self.assertEqual(archive_resolved_reports(retention_days=30, batch_size=1), 2)
+        self.assertEqual(list(MovieReport.objects.values_list('status', flat=True)), ['PENDING'])
+
+        client = APIClient()
+        client.credentials(HTTP_AUTH_ID=str(self.admin.id))
+        response = client.get(reverse('list_archived_reports'), {'movie_id': self.movie.id, 'limit': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        response = client.get(reverse('list_archived_reports'), {'cursor': response.data['next_cursor']})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next_cursor'])
+        tampered = base64.urlsafe_b64encode(b'[[1]]').decode()
+        self.assertEqual(client.get(reverse('list_archived_reports'), {'cursor': tampered}).status_code, 400)
+
+        client.credentials(HTTP_AUTH_ID=str(self.users[0].id))
+        self.assertEqual(client.get(reverse('list_archived_reports')).status_code, 403)
+
+    def test_archive_to_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'reports.ndjson.gz')
+            call_command('archive_reports', '--file', path, stdout=io.StringIO())
+            with gzip.open(path, 'rt') as fh:
+                rows = [json.loads(line) for line in fh]
+        self.assertEqual(sorted(row['status'] for row in rows), ['APPROVED', 'REJECTED'])
+        self.assertFalse(ArchivedMovieReport.objects.exists())
@@ -0,0 +1,141 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Movie, Rating, RatingActivityBucket, RatingIngestWatermark, TrendingMovie
+from .utility import committed_prefix
+
+# Window name -> (length, half-life of a vote's weight within that window)
+WINDOWS = {
+    '1h': (timedelta(hours=1), timedelta(minutes=30)),
+    '24h': (timedelta(hours=24), timedelta(hours=6)),
+    '7d': (timedelta(days=7), timedelta(days=2)),
+}
+BUCKET_SIZE = timedelta(hours=1)
+RETENTION = max(length for length, _ in WINDOWS.values()) + BUCKET_SIZE
+
+
+def bucket_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def ingest_ratings(batch_size=5000):
+    """
+    Fold Rating rows added since the last run into hourly activity buckets.
+
+    The rating id watermark (RatingIngestWatermark) advances in the same
+    transaction as the bucket updates, so each rating is counted once, and never
+    past an id that may still be uncommitted (see `committed_prefix`), so a
+    late-committing rating is counted on a later run.
+
+    Returns:
+        int: Number of ratings ingested.
+    """
+    cutoff = timezone.now() - RETENTION
+    ingested = 0
+    while True:
+        with transaction.atomic():
+            # Migration 0014 starts the watermark after the ratings whose rated_at was
+            # backfilled; a missing row likewise starts at the newest rating
+            watermark, _ = RatingIngestWatermark.objects.select_for_update().get_or_create(
+                pk=1, defaults={'last_rating_id': Rating.objects.aggregate(last=Max('id'))['last'] or 0},
+            )
+            after = watermark.last_rating_id
+            rows = committed_prefix(
+                list(
+                    Rating.objects.filter(id__gt=after).order_by('id')
+                    .values_list('id', 'rated_at', 'movie_id', 'score')[:batch_size]
+                ),
+                after,
+            )
+            if not rows:
+                return ingested
+
+            totals = defaultdict(lambda: [0, 0])
+            for _, rated_at, movie_id, score in rows:
+                if rated_at < cutoff:
+                    continue
+                entry = totals[(movie_id, bucket_start(rated_at))]
+                entry[0] += 1
+                entry[1] += score
+                ingested += 1
+
+            for (movie_id, start), (count, score_sum) in totals.items():
+                fields = {
+                    'rating_count': models.F('rating_count') + count,
+                    'score_sum': models.F('score_sum') + score_sum,
+                }
+                bucket = RatingActivityBucket.objects.filter(movie_id=movie_id, bucket_start=start)
+                if not bucket.update(**fields):
+                    RatingActivityBucket.objects.get_or_create(movie_id=movie_id, bucket_start=start)
+                    bucket.update(**fields)
+
+            watermark.last_rating_id = rows[-1][0]
+            watermark.save(update_fields=['last_rating_id', 'updated_at'])
+
+
+def compute_scores(buckets, now):
+    """
+    Time-decayed popularity per window.
+
+    Each bucket contributes its score sum, halved for every half-life between the
+    bucket's midpoint and `now`.
+
+    Args:
+        buckets (iterable): (movie_id, bucket_start, score_sum) tuples.
+        now (datetime): Reference time.
+
+    Returns:
+        dict: Window name -> {movie_id: score}.
+    """
+    scores = {window: defaultdict(float) for window in WINDOWS}
+    for movie_id, start, score_sum in buckets:
+        age = max(now - (start + BUCKET_SIZE / 2), timedelta(0))
+        for window, (length, half_life) in WINDOWS.items():
+            if start + BUCKET_SIZE > now - length:
+                scores[window][movie_id] += score_sum * 0.5 ** (age / half_life)
+    return scores
+
+
+def refresh_rankings():
+    """
+    Rebuild the TrendingMovie table from the activity buckets and prune old buckets.
+
+    Returns:
+        dict: Window name -> number of ranked movies.
+    """
+    now = timezone.now()
+    buckets = RatingActivityBucket.objects.filter(bucket_start__gte=now - RETENTION) \
+        .values_list('movie_id', 'bucket_start', 'score_sum')
+    scores = compute_scores(buckets.iterator(), now)
+
+    movie_ids = set(scores['7d'])
+    movies = dict(
+        (row[0], row[1:]) for row in Movie.objects.filter(id__in=movie_ids).values_list('id', 'genre', 'language')
+    )
+
+    counts = {}
+    with transaction.atomic():
+        for window, window_scores in scores.items():
+            ranked = sorted(
+                (item for item in window_scores.items() if item[0] in movies),
+                key=lambda item: (-item[1], item[0]),
+            )
+            TrendingMovie.objects.filter(window=window).delete()
+            TrendingMovie.objects.bulk_create(
+                [
+                    TrendingMovie(
+                        window=window, rank=rank, movie_id=movie_id, score=score,
+                        genre=movies[movie_id][0], language=movies[movie_id][1], refreshed_at=now,
+                    )
+                    for rank, (movie_id, score) in enumerate(ranked, start=1)
+                ],
+                batch_size=1000,
+            )
+            counts[window] = len(ranked)
+
+    RatingActivityBucket.objects.filter(bucket_start__lt=now - RETENTION).delete()
+    return counts
@@ -1,13 +1,20 @@
 # movies/urls.py
 from django.urls import path
 from .views import list_all_movies, list_user_movies, view_movie_detail, update_movie, create_movie, rate_movie, \
-    report_movie, manage_reported_movies, login_view, register_user, manage_movie_report
+    report_movie, manage_reported_movies, login_view, register_user, manage_movie_report, sync_movies, \
+    movie_events, list_user_ratings, list_user_reports, user_activity_summary, list_trending_movies, \
+    list_archived_reports
 
 urlpatterns = [
     path('signup/',register_user,name='register_user'),
     path('login/',login_view,name='login_view'),
     path('list/', list_all_movies, name='list_all_movies'),
+    path('list/sync/', sync_movies, name='sync_movies'),
+    path('trending/', list_trending_movies, name='list_trending_movies'),
     path('movies/user/', list_user_movies, name='list_user_movies'),
+    path('movies/user/ratings/', list_user_ratings, name='list_user_ratings'),
+    path('movies/user/reports/', list_user_reports, name='list_user_reports'),
+    path('movies/user/activity/', user_activity_summary, name='user_activity_summary'),
     path('movies/<int:movie_id>/', view_movie_detail, name='view_movie_detail'),
     path('movies/create/', create_movie, name='create_movie'),
     path('movies/<int:movie_id>/update/', update_movie, name='update_movie'),
@@ -15,4 +22,6 @@ urlpatterns = [
     path('movies/<int:movie_id>/report/', report_movie, name='report_movie'),
     path('movies/reports/manage/', manage_reported_movies, name='manage_reported_movies'),
     path('movie_reports/<int:report_id>/manage/', manage_movie_report, name='manage_movie_report'),
+    path('movie_reports/archived/', list_archived_reports, name='list_archived_reports'),
+    path('events/', movie_events, name='movie_events'),
 ]
@@ -1,24 +1,51 @@
+import base64
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 
-
-import jwt
-
 from django.conf import settings
-from django.contrib.auth.models import AnonymousUser
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
 from django.http import JsonResponse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
 
-from movies.models import User
-
-# Secret key for signing the JWT
-SECRET_KEY = settings.SECRET_KEY
+from movies.models import IdempotencyKey, User
 
 # Token expiration time
 ACCESS_TOKEN_LIFETIME = timedelta(minutes=45)
 REFRESH_TOKEN_LIFETIME = timedelta(days=1)
 
+_jwt_module = None
+
+
+def get_jwt():
+    """
+    Import the JWT backend on first use instead of at process start.
+
+    Returns:
+        module: The ``jwt`` module.
+    """
+    global _jwt_module
+    if _jwt_module is None:
+        import jwt
+        _jwt_module = jwt
+    return _jwt_module
+
+
+def get_secret_key():
+    """
+    Secret key for signing the JWT, read from settings when a token is handled.
+
+    Returns:
+        str: The signing key.
+    """
+    return settings.SECRET_KEY
+
 
 def generate_access_token(user):
     """
@@ -36,7 +63,7 @@ def generate_access_token(user):
         'exp': expiration,
         'iat': datetime.utcnow()
     }
-    return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
+    return get_jwt().encode(payload, get_secret_key(), algorithm='HS256')
 
 
 def generate_refresh_token(user):
@@ -55,7 +82,7 @@ def generate_refresh_token(user):
         'exp': expiration,
         'iat': datetime.utcnow()
     }
-    return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
+    return get_jwt().encode(payload, get_secret_key(), algorithm='HS256')
 
 
 def decode_token(token):
@@ -69,8 +96,9 @@ def decode_token(token):
         dict: The decoded payload if the token is valid.
         JsonResponse: An error response if the token is expired or invalid.
     """
+    jwt = get_jwt()
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        payload = jwt.decode(token, get_secret_key(), algorithms=['HS256'])
         return payload
     except jwt.ExpiredSignatureError:
         return JsonResponse({"message": "Token is expired"}, status=status.HTTP_498_INVALID_TOKEN)
@@ -135,6 +163,7 @@ def decode_token(token):
 def is_auth(fun):
     @wraps(fun)
     def wrap(request, *args, **kwargs):
+        jwt = get_jwt()
         try:
             # Check for auth-id header as a shortcut for testing purposes
             if "auth-id" in request.headers:
@@ -148,7 +177,7 @@ def is_auth(fun):
             if not token:
                 return JsonResponse({"message": "Authorization Token is missing!"}, status=status.HTTP_403_FORBIDDEN)
 
-            decode_token_result = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+            decode_token_result = jwt.decode(token, get_secret_key(), algorithms=['HS256'])
             user_id = decode_token_result.get("user_id")
             print(f"Decoded user_id: {user_id}")
 
@@ -169,6 +198,111 @@ def is_auth(fun):
     return wrap
 
 
+IDEMPOTENCY_CACHE_SIZE = 1024
+
+_idempotency_cache = OrderedDict()
+_idempotency_cache_lock = threading.Lock()
+
+
+def _cache_get(cache_key):
+    with _idempotency_cache_lock:
+        entry = _idempotency_cache.get(cache_key)
+        if entry is None:
+            return None
+        if entry['expires_at'] <= timezone.now():
+            del _idempotency_cache[cache_key]
+            return None
+        _idempotency_cache.move_to_end(cache_key)
+        return entry
+
+
+def _cache_put(cache_key, entry):
+    with _idempotency_cache_lock:
+        _idempotency_cache[cache_key] = entry
+        _idempotency_cache.move_to_end(cache_key)
+        while len(_idempotency_cache) > IDEMPOTENCY_CACHE_SIZE:
+            _idempotency_cache.popitem(last=False)
+
+
+def _replay(entry, fingerprint):
+    if entry['fingerprint'] != fingerprint:
+        return Response({"message": "Idempotency-Key was already used for a different request"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    return Response(entry['response_body'], status=entry['status_code'], headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(fun):
+    """
+    Decorator that replays the stored response when a request repeats an `Idempotency-Key`.
+
+    Apply below `is_auth`, as keys are scoped per user. Requests without the
+    header run as usual. Stored responses expire after
+    settings.IDEMPOTENCY_KEY_TTL seconds.
+
+    Args:
+        fun (function): The view function to wrap.
+
+    Returns:
+        function: The wrapped view.
+    """
+
+    @wraps(fun)
+    def wrap(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return fun(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({"message": "Idempotency-Key is too long"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = hashlib.sha256(
+            request.method.encode() + b' ' + request.path.encode() + b'\n' + request.body
+        ).hexdigest()
+        cache_key = (request.user.id, key)
+
+        entry = _cache_get(cache_key)
+        if entry is not None:
+            return _replay(entry, fingerprint)
+
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+        IdempotencyKey.objects.filter(user_id=request.user.id, key=key, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user_id=request.user.id, key=key, fingerprint=fingerprint, expires_at=expires_at,
+                )
+        except IntegrityError:
+            record = IdempotencyKey.objects.get(user_id=request.user.id, key=key)
+            if record.status_code is None:
+                return Response({"message": "A request with this Idempotency-Key is still in progress"},
+                                status=status.HTTP_409_CONFLICT)
+            entry = {
+                'fingerprint': record.fingerprint, 'status_code': record.status_code,
+                'response_body': record.response_body, 'expires_at': record.expires_at,
+            }
+            _cache_put(cache_key, entry)
+            return _replay(entry, fingerprint)
+
+        response = fun(request, *args, **kwargs)
+        if response.status_code >= 500 or not hasattr(response, 'data'):
+            # Let the client retry server errors
+            record.delete()
+            return response
+
+        record.status_code = response.status_code
+        record.response_body = json.loads(json.dumps(response.data, cls=DjangoJSONEncoder))
+        record.save(update_fields=['status_code', 'response_body'])
+        entry = {
+            'fingerprint': fingerprint, 'status_code': response.status_code,
+            'response_body': record.response_body, 'expires_at': expires_at,
+        }
+        # Only remember the response in-process once the write has committed
+        transaction.on_commit(lambda: _cache_put(cache_key, entry))
+        return response
+
+    return wrap
+
+
 def is_admin(view_func):
     """
     Decorator to check if the user is an admin.
@@ -184,3 +318,124 @@ def is_admin(view_func):
 
     return _wrapped_view
 
+
+def encode_sync_token(movie_cursor, tombstone_cursor):
+    """
+    Build an opaque delta sync token.
+
+    Args:
+        movie_cursor (tuple): (updated_at, id) of the last movie the client has seen.
+        tombstone_cursor (tuple): (deleted_at, id) of the last tombstone the client has seen.
+
+    Returns:
+        str: URL-safe token to pass back as `since`.
+    """
+    payload = {
+        'm': [movie_cursor[0].isoformat(), movie_cursor[1]],
+        't': [tombstone_cursor[0].isoformat(), tombstone_cursor[1]],
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_sync_token(token):
+    """
+    Decode a delta sync token built by `encode_sync_token`.
+
+    Args:
+        token (str): The `since` token from the client.
+
+    Returns:
+        tuple: (movie_cursor, tombstone_cursor), each a (datetime, id) pair.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        cursors = tuple(
+            (datetime.fromisoformat(payload[key][0]), int(payload[key][1]))
+            for key in ('m', 't')
+        )
+    except (KeyError, IndexError, TypeError, ValueError, OverflowError) as exc:
+        raise ValueError("Invalid sync token") from exc
+    if any(timezone.is_naive(moment) for moment, _ in cursors):
+        raise ValueError("Invalid sync token")
+    return cursors
+
+
+def encode_cursor(values):
+    """
+    Build an opaque keyset pagination cursor.
+
+    Args:
+        values (list): Ordering values of the last row returned (datetimes allowed).
+
+    Returns:
+        str: URL-safe cursor to pass back as `cursor`.
+    """
+    payload = [
+        {'dt': value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(token, types=None):
+    """
+    Decode a cursor built by `encode_cursor`.
+
+    Args:
+        token (str): The `cursor` query parameter.
+        types (tuple): Expected type of each value, e.g. (datetime, int).
+
+    Returns:
+        list: The ordering values.
+
+    Raises:
+        ValueError: If the cursor is malformed or its values don't match `types`.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        values = [
+            datetime.fromisoformat(value['dt']) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+    if types is not None:
+        # type() rather than isinstance(): a bool is not an id
+        if len(values) != len(types) or any(type(value) is not kind for value, kind in zip(values, types)):
+            raise ValueError("Invalid cursor")
+        if any(isinstance(value, datetime) and timezone.is_naive(value) for value in values):
+            raise ValueError("Invalid cursor")
+    return values
+
+
+def committed_prefix(rows, after, timeout=None):
+    """
+    Leading rows of an id-ordered batch that are safe to consume past `after`.
+
+    Ids are assigned at INSERT but rows only become visible at COMMIT, so a missing
+    id may belong to a transaction that is still open and would be skipped for good
+    once a watermark moves past it. Stop at the first gap unless the row after it is
+    older than `timeout` seconds (settings.ID_GAP_TIMEOUT), by then the missing id
+    must have been rolled back.
+
+    Args:
+        rows (list): (id, created_at, ...) tuples or objects with `id`/`created_at`, ordered by id.
+        after (int): Last id already consumed.
+
+    Returns:
+        list: The consumable prefix of `rows`.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'ID_GAP_TIMEOUT', 60)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    expected = after + 1
+    for index, row in enumerate(rows):
+        row_id, created_at = (row[0], row[1]) if isinstance(row, tuple) else (row.id, row.created_at)
+        if row_id != expected and created_at > cutoff:
+            return rows[:index]
+        expected = row_id + 1
+    return rows
@@ -1,17 +1,39 @@
-from django.http import JsonResponse
-from knox.serializers import UserSerializer, User
+import math
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Avg, Count, Q
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 
-from .utility import generate_access_token, generate_refresh_token, is_admin
-from .models import Movie, Rating, MovieReport
-from .serializers import MovieSerializer, RatingSerializer, LoginSerializer, MovieReportSerializer
-from .utility import is_auth
+from .query_budget import query_budget
+from .utility import generate_access_token, generate_refresh_token, is_admin, is_auth, idempotent, encode_sync_token, \
+    decode_sync_token, encode_cursor, decode_cursor, committed_prefix
+from .models import Movie, Rating, MovieReport, CatalogueVersion, MovieTombstone, OutboxEvent, MovieReportSummary, \
+    TrendingMovie, ArchivedMovieReport
+from .serializers import MovieSerializer, RatingSerializer, MovieReportSerializer, UserSerializer, \
+    MovieSyncSerializer
 
-from django.db.models import Avg
+SYNC_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+SYNC_DEFAULT_LIMIT = 500
+SYNC_MAX_LIMIT = 1000
+
+TRENDING_DEFAULT_LIMIT = 20
+TRENDING_MAX_LIMIT = 100
+
+USER_PAGE_DEFAULT_LIMIT = 50
+USER_PAGE_MAX_LIMIT = 200
+
+EVENTS_MAX_WAIT = 30
+EVENTS_POLL_INTERVAL = 1
+EVENTS_BATCH_SIZE = 100
 
 @api_view(['POST'])
+@query_budget(queries=2, db_ms=100)
 def register_user(request):
 
     """
@@ -27,6 +49,7 @@ def register_user(request):
 
 
 @api_view(['POST'])
+@query_budget(queries=1, db_ms=50)
 def login_view(request):
     """
     Logs in the user without authenticating.
@@ -49,6 +72,7 @@ def login_view(request):
 
 
 @api_view(['GET'])
+@query_budget(queries=3, db_ms=500)
 @is_auth
 def list_all_movies(request):
     """
@@ -59,14 +83,128 @@ def list_all_movies(request):
 
         Returns:
             - List of all movies (200).
+            - 304 when `If-None-Match` matches the current catalogue ETag.
         """
 
+    # The ETag comes from the catalogue version row, so a 304 never reads Movie
+    etag = f'"catalogue-{CatalogueVersion.current()}"'
+    if_none_match = request.headers.get('If-None-Match', '')
+    # Weak comparison: compressed responses carry the ETag as W/"..."
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    if etag in tags or if_none_match.strip() == '*':
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
     movies = Movie.objects.all()
     serializer = MovieSerializer(movies, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(serializer.data, status=status.HTTP_200_OK, headers={'ETag': etag})
+
+
+@api_view(['GET'])
+@query_budget(queries=3, db_ms=100)
+@is_auth
+def sync_movies(request):
+    """
+        Returns movies changed and deleted since a sync token.
+
+        Expects:
+            - `since` (optional): token from a previous response; omit for a full sync.
+            - `limit` (optional): page size per stream, up to 1000.
+
+        Returns:
+            - `changed`, `deleted` movie ids, the next `since` token and `has_more` (200).
+              Changes from the last ID_GAP_TIMEOUT seconds are sent again on the next sync.
+        """
+
+    since = request.query_params.get('since')
+    try:
+        limit = min(int(request.query_params.get('limit', SYNC_DEFAULT_LIMIT)), SYNC_MAX_LIMIT)
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return Response({"message": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if since:
+        try:
+            movie_cursor, tombstone_cursor = decode_sync_token(since)
+        except ValueError:
+            return Response({"message": "Invalid sync token"}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        movie_cursor = tombstone_cursor = (SYNC_EPOCH, 0)
+
+    movies = list(
+        Movie.objects.filter(
+            Q(updated_at__gt=movie_cursor[0]) | Q(updated_at=movie_cursor[0], id__gt=movie_cursor[1])
+        ).order_by('updated_at', 'id')[:limit]
+    )
+    tombstones = list(
+        MovieTombstone.objects.filter(
+            Q(deleted_at__gt=tombstone_cursor[0]) | Q(deleted_at=tombstone_cursor[0], id__gt=tombstone_cursor[1])
+        ).order_by('deleted_at', 'id')[:limit]
+    )
+
+    # Timestamps are taken at save but rows only show up at commit, so a row stamped
+    # just before this read may still appear behind it. Recent rows are returned but
+    # the cursor stays at the settle point and re-sends them next time.
+    settled = (datetime.now(timezone.utc) - timedelta(seconds=getattr(settings, 'ID_GAP_TIMEOUT', 60)), 0)
+    has_more = False
+    if movies:
+        end = (movies[-1].updated_at, movies[-1].id)
+        movie_cursor = max(movie_cursor, min(end, settled))
+        has_more |= len(movies) == limit and end <= settled
+    if tombstones:
+        end = (tombstones[-1].deleted_at, tombstones[-1].id)
+        tombstone_cursor = max(tombstone_cursor, min(end, settled))
+        has_more |= len(tombstones) == limit and end <= settled
+
+    return Response({
+        "changed": MovieSyncSerializer(movies, many=True).data,
+        "deleted": [tombstone.movie_id for tombstone in tombstones],
+        "since": encode_sync_token(movie_cursor, tombstone_cursor),
+        "has_more": has_more,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@query_budget(queries=2, db_ms=50)
+@is_auth
+def list_trending_movies(request):
+    """
+        Retrieves the trending movies from the materialized ranking.
+
+        Expects:
+            - `window` (optional): '1h', '24h' (default) or '7d'.
+            - `genre`, `language` (optional): exact-match filters.
+            - `limit` (optional): number of movies, up to 100.
+
+        Returns:
+            - Ranked movies with their trending score (200).
+        """
+
+    window = request.query_params.get('window', '24h')
+    if window not in dict(TrendingMovie.WINDOW_CHOICES):
+        return Response({"message": "Invalid window"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(int(request.query_params.get('limit', TRENDING_DEFAULT_LIMIT)), TRENDING_MAX_LIMIT)
+    except ValueError:
+        return Response({"message": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+    entries = TrendingMovie.objects.filter(window=window)
+    if request.query_params.get('genre'):
+        entries = entries.filter(genre=request.query_params['genre'])
+    if request.query_params.get('language'):
+        entries = entries.filter(language=request.query_params['language'])
+    entries = entries.select_related('movie').order_by('rank')[:max(limit, 0)]
+
+    results = []
+    for entry in entries:
+        data = MovieSyncSerializer(entry.movie).data
+        data['trending_score'] = entry.score
+        results.append(data)
+    return Response(results, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
+@query_budget(queries=2, db_ms=200)
 @is_auth
 def list_user_movies(request):
     """
@@ -85,7 +223,102 @@ def list_user_movies(request):
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+def _page_limit(request):
+    limit = min(int(request.query_params.get('limit', USER_PAGE_DEFAULT_LIMIT)), USER_PAGE_MAX_LIMIT)
+    if limit < 1:
+        raise ValueError("Invalid limit")
+    return limit
+
+
+@api_view(['GET'])
+@query_budget(queries=2, db_ms=50)
+@is_auth
+def list_user_ratings(request):
+    """
+       Retrieves the ratings given by the authenticated user, ordered by movie.
+
+       Expects:
+           - `cursor` (optional): `next_cursor` from the previous page.
+           - `limit` (optional): page size, up to 200.
+
+       Returns:
+           - `results` and `next_cursor` (null on the last page) (200).
+       """
+
+    try:
+        limit = _page_limit(request)
+        cursor = request.query_params.get('cursor')
+        ratings = Rating.objects.filter(user=request.user)
+        if cursor:
+            movie_id, rating_id = decode_cursor(cursor, types=(int, int))
+            ratings = ratings.filter(Q(movie_id__gt=movie_id) | Q(movie_id=movie_id, id__gt=rating_id))
+    except ValueError:
+        return Response({"message": "Invalid cursor or limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = list(ratings.order_by('movie_id', 'id').values('id', 'movie_id', 'movie__title', 'score')[:limit + 1])
+    next_cursor = encode_cursor([rows[limit - 1]['movie_id'], rows[limit - 1]['id']]) if len(rows) > limit else None
+    results = [
+        {"movie_id": row['movie_id'], "title": row['movie__title'], "score": row['score']}
+        for row in rows[:limit]
+    ]
+    return Response({"results": results, "next_cursor": next_cursor}, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
+@query_budget(queries=2, db_ms=50)
+@is_auth
+def list_user_reports(request):
+    """
+       Retrieves the reports filed by the authenticated user, newest first.
+
+       Expects:
+           - `cursor` (optional): `next_cursor` from the previous page.
+           - `limit` (optional): page size, up to 200.
+
+       Returns:
+           - `results` and `next_cursor` (null on the last page) (200).
+       """
+
+    try:
+        limit = _page_limit(request)
+        cursor = request.query_params.get('cursor')
+        reports = MovieReport.objects.filter(user=request.user)
+        if cursor:
+            reported_at, report_id = decode_cursor(cursor, types=(datetime, int))
+            reports = reports.filter(Q(reported_at__lt=reported_at) | Q(reported_at=reported_at, id__lt=report_id))
+    except ValueError:
+        return Response({"message": "Invalid cursor or limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = list(
+        reports.order_by('-reported_at', '-id').values('id', 'movie_id', 'status', 'reported_at')[:limit + 1]
+    )
+    next_cursor = encode_cursor([rows[limit - 1]['reported_at'], rows[limit - 1]['id']]) if len(rows) > limit else None
+    return Response({"results": rows[:limit], "next_cursor": next_cursor}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@query_budget(queries=4, db_ms=100)
+@is_auth
+def user_activity_summary(request):
+    """
+       Summarises the authenticated user's activity with one aggregate query per table.
+
+       Returns:
+           - `movies_created`, `ratings_given`, `average_score_given` and `reports_filed` (200).
+       """
+
+    user = request.user
+    ratings = Rating.objects.filter(user=user).aggregate(count=Count('id'), average=Avg('score'))
+    return Response({
+        "movies_created": Movie.objects.filter(created_by=user).count(),
+        "ratings_given": ratings['count'],
+        "average_score_given": ratings['average'],
+        "reports_filed": MovieReport.objects.filter(user=user).count(),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@query_budget(queries=3, db_ms=50)
 @is_auth
 def view_movie_detail(request, movie_id):
     """
@@ -99,6 +332,9 @@ def view_movie_detail(request, movie_id):
 
     try:
         movie = Movie.objects.get(id=movie_id)
+        if movie.rating_shards > 1:
+            # Widened movies are folded periodically; read their live totals
+            movie.average_rating, movie.total_rating = movie.live_rating()
         serializer = MovieSerializer(movie)
         return Response(serializer.data, status=status.HTTP_200_OK)
     except Movie.DoesNotExist:
@@ -106,7 +342,9 @@ def view_movie_detail(request, movie_id):
 
 
 @api_view(['POST'])
+@query_budget(queries=9, db_ms=100)
 @is_auth
+@idempotent
 def create_movie(request):
     # Extract data from request
     title = request.data.get("title")
@@ -127,11 +365,13 @@ def create_movie(request):
         created_by=request.user  # `request.user` is the full User object here
     )
     movie.save()
+    OutboxEvent.record('movie.created', movie.id, {'title': movie.title, 'created_by': request.user.id})
 
     return Response({"message": "Movie created successfully!"}, status=201)
 
 
 @api_view(['PUT'])
+@query_budget(queries=6, db_ms=100)
 @is_auth
 def update_movie(request, movie_id):
     """
@@ -147,7 +387,7 @@ def update_movie(request, movie_id):
         return Response({"message": "Movie not found"}, status=status.HTTP_404_NOT_FOUND)
 
     # Check if the current user is the creator of the movie
-    if movie.created_by != request.user:
+    if movie.created_by_id != request.user.id:
         return Response({"message": "Only the creator or an admin can update this movie."},
                         status=status.HTTP_403_FORBIDDEN)
 
@@ -155,6 +395,7 @@ def update_movie(request, movie_id):
 
     if serializer.is_valid():
         serializer.save()
+        OutboxEvent.record('movie.updated', movie.id, {'fields': sorted(serializer.validated_data)})
         return Response(serializer.data, status=status.HTTP_200_OK)
     else:
         # Print serializer errors to debug
@@ -163,7 +404,9 @@ def update_movie(request, movie_id):
 
 
 @api_view(['POST'])
+@query_budget(queries=15, db_ms=100)
 @is_auth
+@idempotent
 def rate_movie(request, movie_id):
     """
     Allow an authenticated user to add or update their rating for a movie.
@@ -190,7 +433,9 @@ def rate_movie(request, movie_id):
 
 
 @api_view(['POST'])
+@query_budget(queries=16, db_ms=100)
 @is_auth
+@idempotent
 def report_movie(request, movie_id):
     """
     Allows an authenticated user to report a movie.
@@ -202,13 +447,18 @@ def report_movie(request, movie_id):
 
     serializer = MovieReportSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
-        serializer.save(movie=movie)
-        return Response({"message": "Movie reported successfully", "data": serializer.data}, status=status.HTTP_201_CREATED)
+        # One report per (movie, user); repeat reports only refresh the reason
+        report, created = MovieReport.file(movie, request.user, serializer.validated_data['reason'])
+        event_type = 'report.created' if created else 'report.updated'
+        OutboxEvent.record(event_type, movie.id, {'report_id': report.id, 'user_id': request.user.id})
+        return Response({"message": "Movie reported successfully", "data": MovieReportSerializer(report).data},
+                        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['GET', 'PATCH'])
+@query_budget(queries=7, db_ms=200)
 @is_auth
 def manage_reported_movies(request):
     """
@@ -218,40 +468,140 @@ def manage_reported_movies(request):
         return Response({"message": "Admin access required"}, status=status.HTTP_403_FORBIDDEN)
 
     if request.method == 'GET':
-        # Get all reported movies with status 'PENDING'
-        reports = MovieReport.objects.filter(status='PENDING')
+        # Movies past the threshold show up once, with their pending count,
+        # instead of one entry per report
+        threshold = getattr(settings, 'REPORT_COLLAPSE_THRESHOLD', 10)
+        collapsed = MovieReportSummary.objects.filter(pending_count__gte=threshold)
+        reports = MovieReport.objects.filter(status='PENDING').exclude(
+            movie_id__in=collapsed.values('movie_id')
+        )
         serializer = MovieReportSerializer(reports, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        collapsed_entries = [
+            {"movie": summary.movie_id, "status": "PENDING", "collapsed": True,
+             "pending_count": summary.pending_count, "last_reported_at": summary.last_reported_at}
+            for summary in collapsed.order_by('-pending_count')
+        ]
+        return Response(collapsed_entries + serializer.data, status=status.HTTP_200_OK)
 
     if request.method == 'PATCH':
-        # Update a specific report's status
+        # Update a specific report's status, or every pending report of a collapsed movie
         report_id = request.data.get('report_id')
+        movie_id = request.data.get('movie_id')
         new_status = request.data.get('status')
 
         if new_status not in dict(MovieReport.STATUS_CHOICES):
             return Response({"message": "Invalid status value"}, status=status.HTTP_400_BAD_REQUEST)
 
+        if movie_id and not report_id:
+            updated = MovieReport.objects.filter(movie_id=movie_id, status='PENDING').update(status=new_status)
+            if new_status != 'PENDING':
+                MovieReportSummary.adjust(movie_id, pending=-updated)
+            OutboxEvent.record('report.status_changed', movie_id, {'status': new_status, 'count': updated})
+            return Response({"message": f"{updated} reports updated successfully"}, status=status.HTTP_200_OK)
+
         try:
             report = MovieReport.objects.get(id=report_id)
-            report.status = new_status
-            report.save()
+            report.set_status(new_status)
+            OutboxEvent.record('report.status_changed', report.movie_id, {'report_id': report.id, 'status': new_status})
             return Response({"message": "Report status updated successfully"}, status=status.HTTP_200_OK)
         except MovieReport.DoesNotExist:
             return Response({"message": "Report not found"}, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['GET'])
+@query_budget(queries=2, db_ms=50)
+@is_auth
+def list_archived_reports(request):
+    """
+    Allows an admin to look up archived (resolved and moved out) movie reports, newest first.
+
+    Expects:
+        - `movie_id`, `user_id`, `status` (optional): filters.
+        - `cursor` (optional): `next_cursor` from the previous page.
+        - `limit` (optional): page size, up to 200.
+    """
+    if not request.user.is_staff:
+        return Response({"message": "Admin access required"}, status=status.HTTP_403_FORBIDDEN)
+
+    reports = ArchivedMovieReport.objects.all()
+    try:
+        limit = _page_limit(request)
+        for field in ('movie_id', 'user_id'):
+            if request.query_params.get(field):
+                reports = reports.filter(**{field: int(request.query_params[field])})
+        if request.query_params.get('status'):
+            reports = reports.filter(status=request.query_params['status'])
+        if request.query_params.get('cursor'):
+            (last_id,) = decode_cursor(request.query_params['cursor'], types=(int,))
+            reports = reports.filter(id__lt=last_id)
+    except ValueError:
+        return Response({"message": "Invalid filter, cursor or limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = list(reports.order_by('-id').values()[:limit + 1])
+    next_cursor = encode_cursor([rows[limit - 1]['id']]) if len(rows) > limit else None
+    return Response({"results": rows[:limit], "next_cursor": next_cursor}, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
+@query_budget(queries=7, db_ms=100)
+@is_auth
 @is_admin  # A decorator to ensure the user is an admin
-def manage_movie_report(request, report_id, status=None):
+def manage_movie_report(request, report_id):
     try:
         report = MovieReport.objects.get(id=report_id)
     except MovieReport.DoesNotExist:
         return Response({"message": "Report not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    status = request.data.get('status')
-    if status not in ['APPROVED', 'REJECTED']:
+    new_status = request.data.get('status')
+    if new_status not in ['APPROVED', 'REJECTED']:
         return Response({"message": "Invalid status"}, status=status.HTTP_400_BAD_REQUEST)
 
-    report.status = status
-    report.save()
-    return Response({"message": f"Report {status.lower()} successfully."}, status=status.HTTP_200_OK)
+    report.set_status(new_status)
+    OutboxEvent.record('report.status_changed', report.movie_id, {'report_id': report.id, 'status': new_status})
+    return Response({"message": f"Report {new_status.lower()} successfully."}, status=status.HTTP_200_OK)
+
+
+@transaction.non_atomic_requests
+@api_view(['GET'])
+# One read per poll for the whole wait, plus the user lookup
+@query_budget(queries=2 + EVENTS_MAX_WAIT // EVENTS_POLL_INTERVAL, db_ms=500)
+@is_auth
+def movie_events(request):
+    """
+        Long-polls the change feed for events after a given id.
+
+        Expects:
+            - `after` (optional): last event id the client has seen, defaults to 0.
+            - `wait` (optional): seconds to wait for new events, up to 30.
+
+        Returns:
+            - `events` and the `last_id` to pass as `after` next time (200).
+            - 403 for non-staff users: report events carry reporter and report ids.
+        """
+    if not request.user.is_staff:
+        return Response({"message": "Admin access required"}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        after = int(request.query_params.get('after', 0))
+        wait = float(request.query_params.get('wait', 20))
+        # nan/inf would slip past min()/max() and poll forever
+        if not math.isfinite(wait):
+            raise ValueError
+    except ValueError:
+        return Response({"message": "Invalid after or wait value"}, status=status.HTTP_400_BAD_REQUEST)
+
+    deadline = time.monotonic() + min(max(wait, 0), EVENTS_MAX_WAIT)
+    while True:
+        # Not wrapped in ATOMIC_REQUESTS, so every poll sees newly committed rows
+        # and events behind a possibly uncommitted id wait for it
+        events = committed_prefix(
+            list(OutboxEvent.objects.filter(id__gt=after).order_by('id')[:EVENTS_BATCH_SIZE]), after,
+        )
+        if events or time.monotonic() >= deadline:
+            break
+        time.sleep(EVENTS_POLL_INTERVAL)
+
+    return Response({
+        "events": [event.as_dict() for event in events],
+        "last_id": events[-1].id if events else after,
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,71 @@
+import logging
+
+from django.db import connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def prime_url_resolver():
+    """
+    Populate the URL resolver caches so the first request doesn't pay for them.
+
+    Returns:
+        int: Number of URL patterns walked.
+    """
+    resolver = get_resolver()
+    # Accessing reverse_dict builds the lookup tables for every included urlconf
+    resolver.reverse_dict
+    count = 0
+    stack = list(resolver.url_patterns)
+    while stack:
+        pattern = stack.pop()
+        count += 1
+        stack.extend(getattr(pattern, 'url_patterns', []))
+    return count
+
+
+def prime_serializers():
+    """
+    Import the serializers and build their field maps once per worker.
+
+    Returns:
+        int: Number of serializers primed.
+    """
+    from . import serializers
+
+    classes = [
+        serializers.UserSerializer,
+        serializers.MovieSerializer,
+        serializers.RatingSerializer,
+        serializers.MovieReportSerializer,
+    ]
+    for serializer_class in classes:
+        serializer_class().fields
+    return len(classes)
+
+
+def prime_db_connections():
+    """
+    Open a connection for every configured database alias.
+
+    Returns:
+        int: Number of connections opened.
+    """
+    for conn in connections.all():
+        conn.ensure_connection()
+    return len(connections.all())
+
+
+def warm_up():
+    """
+    Prime URL resolution, serializers and DB connections before a worker accepts traffic.
+
+    Each step is best effort: a failing step is logged and the worker still starts.
+    """
+    for step in (prime_url_resolver, prime_serializers, prime_db_connections):
+        try:
+            result = step()
+            logger.info("warm-up %s: %s", step.__name__, result)
+        except Exception:
+            logger.exception("warm-up %s failed", step.__name__)